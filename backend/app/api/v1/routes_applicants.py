@@ -4,38 +4,40 @@ from pathlib import Path
 from typing import Any, Dict, List, Tuple
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
 from app.core import config
-from app.core.deps import get_current_user, require_roles
+from app.core.deps import get_current_user, get_latency_budget, require_roles
+from app.dao import async_dao
 from app.dao.jobs_dao import get_job_by_id
 from app.dao.processed_dao import (
     get_application_for_user,
     get_by_id as get_applicant_by_id,
     insert_processed,
-    list_by_email,
-    list_by_job,
     mark_invite_sent,
     delete_application_for_user,
 )
+from app.services import dedup_service
+from app.services.cv_matching_service import build_cv_analysis
+from app.services.cv_service import extract_text_from_path
 from app.services.email_service import send_email
 
 router = APIRouter(prefix="/applicants", tags=["applicants"])
 
 
 @router.get("")
-def get_applicants(
+async def get_applicants(
     job_id: int = Query(..., description="Job ID"),
     current_user: dict = Depends(require_roles("admin", "employer")),
 ) -> List[Dict[str, Any]]:
-    job = get_job_by_id(job_id)
+    job = await async_dao.jobs.get_job_by_id(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     if current_user["role"] == "employer" and job.get("employer_id") != current_user["id"]:
         raise HTTPException(status_code=403, detail="Not allowed to view this job.")
-    return list_by_job(job_id)
+    return await async_dao.processed.list_by_job(job_id)
 
 
 @router.post("/log")
@@ -50,7 +52,9 @@ def log_applicant(
             raise HTTPException(status_code=404, detail="Job not found")
         if current_user["role"] == "employer" and job.get("employer_id") != current_user["id"]:
             raise HTTPException(status_code=403, detail="Not allowed to log for this job.")
+    payload["cv_minhash"] = dedup_service.signature_blob(str(payload.get("cv_text") or ""))
     new_id = insert_processed(payload)
+    dedup_service.index_cv(new_id, payload["cv_minhash"])
     return {"id": new_id}
 
 
@@ -159,23 +163,107 @@ def upload_cv_file(
     return {"path": stored_path, "filename": original_name}
 
 
+def _remove_stored_cv(stored_path: str) -> None:
+    if not stored_path:
+        return
+    try:
+        (CV_DIR / stored_path).unlink()
+    except OSError:
+        pass
+
+
+def _similar_cv_texts(cv_minhash: bytes | None, limit: int = 3) -> List[str]:
+    """CV texts of earlier applications that are near-identical to this one."""
+    if not cv_minhash:
+        return []
+    texts = []
+    for applicant_id, _ in dedup_service.find_duplicate_cvs(
+        threshold=dedup_service.REUSE_THRESHOLD, blob=cv_minhash
+    )[:limit]:
+        row = get_applicant_by_id(applicant_id)
+        if row and row.get("cv_text"):
+            texts.append(row["cv_text"])
+    return texts
+
+
+@router.post("/apply")
+def apply_for_job(
+    job_id: int = Form(...),
+    cv_text: str = Form(default=""),
+    file: UploadFile | None = File(default=None),
+    budget: float = Depends(get_latency_budget),
+    current_user: dict = Depends(require_roles("student", "admin")),
+):
+    """Upload, extract, score and log an application in one request.
+
+    The file is streamed to ``CV_UPLOAD_DIR`` and parsed from there, so the
+    CV crosses the wire once; an uploaded file takes precedence over
+    ``cv_text``.
+    """
+    job = get_job_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    stored_path, uploaded_filename = "", "(pasted text)"
+    if file is not None and file.filename:
+        stored_path, uploaded_filename = _save_cv_file(file)
+        cv_text = extract_text_from_path(str(CV_DIR / stored_path), uploaded_filename)
+    cv_text = (cv_text or "").strip()
+    if not cv_text:
+        _remove_stored_cv(stored_path)
+        raise HTTPException(
+            status_code=400, detail="Upload a CV file or paste your CV text before applying."
+        )
+
+    try:
+        cv_minhash = dedup_service.signature_blob(cv_text)
+        result = build_cv_analysis(
+            cv_text, job, budget=budget, similar_cv_texts=_similar_cv_texts(cv_minhash)
+        )
+        payload = {
+            "name": current_user.get("name") or "Candidate",
+            "email": current_user.get("email") or "",
+            "uploaded_filename": uploaded_filename,
+            "uploaded_file_path": stored_path,
+            "job_id": job["id"],
+            "jd_summary": (job.get("jd_text") or "")[:1000],
+            "coverage": result.coverage,
+            "similarity": result.similarity,
+            "missing": ", ".join(result.missing),
+            "passed": 1 if result.passed else 0,
+            "hr_email": job.get("hr_email") or "",
+            "predicted_role": result.predicted_role,
+            "company_name": job.get("company_name") or "",
+            "job_title": job.get("title") or "",
+            "cv_text": cv_text,
+            "cv_minhash": cv_minhash,
+        }
+        new_id = insert_processed(payload)
+    except Exception:
+        # No processed row points at the file, so do not leave it behind.
+        _remove_stored_cv(stored_path)
+        raise
+    dedup_service.index_cv(new_id, payload["cv_minhash"])
+    return {"id": new_id, "result": result}
+
+
 @router.get("/my")
-def get_my_applications(current_user: dict = Depends(require_roles("student", "admin"))):
+async def get_my_applications(current_user: dict = Depends(require_roles("student", "admin"))):
     email = current_user.get("email")
     if not email:
         raise HTTPException(status_code=400, detail="Current user email missing.")
-    return list_by_email(email)
+    return await async_dao.processed.list_by_email(email)
 
 
 @router.get("/my/{application_id}")
-def get_my_application_detail(
+async def get_my_application_detail(
     application_id: int,
     current_user: dict = Depends(require_roles("student", "admin")),
 ):
     email = current_user.get("email")
     if not email:
         raise HTTPException(status_code=400, detail="Current user email missing.")
-    record = get_application_for_user(application_id, email)
+    record = await async_dao.processed.get_application_for_user(application_id, email)
     if not record:
         raise HTTPException(status_code=404, detail="Application not found.")
     return record
@@ -219,6 +307,7 @@ def delete_my_application(
         raise HTTPException(status_code=404, detail="Application not found.")
     if not delete_application_for_user(application_id, email):
         raise HTTPException(status_code=500, detail="Failed to delete application.")
+    dedup_service.remove_cv(application_id)
     raw_path = record.get("uploaded_file_path")
     if raw_path:
         file_path = Path(raw_path)
@@ -1,32 +1,60 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
-from app.schemas.schemas import CVProcessRequest, CVProcessResult
-from app.dao.jobs_dao import get_job_by_id
+from fastapi.responses import StreamingResponse
+from app.schemas.schemas import (
+    CVBatchItem,
+    CVBatchRequest,
+    CVBatchResult,
+    CVProcessRequest,
+    CVProcessResult,
+)
+from app.dao.jobs_dao import get_job_by_id, get_jobs_by_ids
 from app.services.cv_service import extract_text_generic_from_bytes
-from app.services.cv_matching_service import build_cv_analysis
-from app.core.deps import get_current_user
+from app.services.cv_matching_service import (
+    build_cv_analysis,
+    get_cv_features,
+    iter_analyse_cv_features,
+)
+from app.services import analysis_jobs_service, profile_service
+from app.core.deps import get_current_user, get_latency_budget
 
 router = APIRouter(prefix="/cv", tags=["cv"])
 
+ANALYSIS_MODE_PATTERN = "^(sync|async)$"
+MAX_BATCH_JOBS = 50
+
+
+def _run_analysis(
+    cv_text: str, job: dict | None, mode: str, current_user: dict, budget: float
+) -> CVProcessResult:
+    if mode == "async":
+        return analysis_jobs_service.start_analysis(cv_text, job, current_user["id"])
+    return build_cv_analysis(cv_text, job, budget=budget)
+
 
 @router.post("/process", response_model=CVProcessResult)
-def process_cv(payload: CVProcessRequest, current_user: dict = Depends(get_current_user)):
-    _ = current_user  # authentication enforced via dependency
+def process_cv(
+    payload: CVProcessRequest,
+    mode: str = Query(default="sync", pattern=ANALYSIS_MODE_PATTERN),
+    budget: float = Depends(get_latency_budget),
+    current_user: dict = Depends(get_current_user),
+):
     cv_text = (payload.cv_text or "").strip()
     job = get_job_by_id(payload.job_id) if payload.job_id else None
 
     if not cv_text:
         raise HTTPException(status_code=400, detail="Missing cv_text")
 
-    return build_cv_analysis(cv_text, job)
+    return _run_analysis(cv_text, job, mode, current_user, budget)
 
 
 @router.post("/process-file", response_model=CVProcessResult)
 def process_cv_file(
     file: UploadFile = File(...),
     job_id: int | None = Query(default=None),
+    mode: str = Query(default="sync", pattern=ANALYSIS_MODE_PATTERN),
+    budget: float = Depends(get_latency_budget),
     current_user: dict = Depends(get_current_user),
 ):
-    _ = current_user  # authentication enforced via dependency
     try:
         data = file.file.read()
     finally:
@@ -36,4 +64,72 @@ def process_cv_file(
             pass
     raw_text = extract_text_generic_from_bytes(file.filename or "", data or b"")
     job = get_job_by_id(job_id) if job_id else None
-    return build_cv_analysis(raw_text, job)
+    return _run_analysis(raw_text, job, mode, current_user, budget)
+
+
+@router.post("/process-batch", response_model=CVBatchResult)
+def process_cv_batch(
+    payload: CVBatchRequest,
+    stream: bool = Query(default=False, description="Stream NDJSON items as they complete"),
+    budget: float = Depends(get_latency_budget),
+    current_user: dict = Depends(get_current_user),
+):
+    job_ids = list(dict.fromkeys(payload.job_ids))
+    if not job_ids:
+        raise HTTPException(status_code=400, detail="Provide at least one job_id")
+    if len(job_ids) > MAX_BATCH_JOBS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BATCH_JOBS} jobs can be analysed at once"
+        )
+    cv_text = (payload.cv_text or "").strip()
+    cv_source = "request"
+    if not cv_text:
+        active_cv = profile_service.get_active_cv(current_user["id"])
+        if not active_cv:
+            raise HTTPException(
+                status_code=400, detail="Missing cv_text and no active CV in My Profile"
+            )
+        cv_text, cv_source = active_cv["text"], active_cv["source"]
+
+    found = get_jobs_by_ids(job_ids)
+    jobs = [found[job_id] for job_id in job_ids if job_id in found]
+    not_found = [
+        CVBatchItem(job_id=job_id, error="Job not found")
+        for job_id in job_ids
+        if job_id not in found
+    ]
+    # CV extraction/embedding happens once for the whole list.
+    results = iter_analyse_cv_features(get_cv_features(cv_text), jobs, budget)
+
+    def _item(index: int, result: CVProcessResult) -> CVBatchItem:
+        job = jobs[index]
+        return CVBatchItem(job_id=job["id"], title=job.get("title"), result=result)
+
+    if stream:
+        def _lines():
+            for item in not_found:
+                yield item.model_dump_json() + "\n"
+            for index, result in results:
+                yield _item(index, result).model_dump_json() + "\n"
+
+        return StreamingResponse(
+            _lines(), media_type="application/x-ndjson", headers={"X-CV-Source": cv_source}
+        )
+
+    items = {item.job_id: item for item in not_found}
+    for index, result in results:
+        item = _item(index, result)
+        items[item.job_id] = item
+    return CVBatchResult(cv_source=cv_source, items=[items[job_id] for job_id in job_ids])
+
+
+@router.get("/analyses/{analysis_id}", response_model=CVProcessResult)
+async def get_cv_analysis(
+    analysis_id: str,
+    wait: float = Query(default=0.0, ge=0.0, le=30.0, description="Long-poll timeout in seconds"),
+    current_user: dict = Depends(get_current_user),
+):
+    result = await analysis_jobs_service.wait_for_analysis(analysis_id, current_user["id"], wait)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return result
@@ -15,10 +15,12 @@ from fastapi import (
 )
 from pydantic import BaseModel, Field
 
-from app.core.deps import require_roles
+from app.core.deps import get_latency_budget, require_roles
 from app.services.skills_service import extract_skills
 from app.services.cv_service import extract_text_generic_from_bytes
 from app.services.gemini_service import (
+    call_with_budget,
+    call_with_budget_async,
     gemini_available,
     generate_interview_feedback_with_gemini,
     generate_interview_questions_from_gemini,
@@ -59,6 +61,7 @@ class InterviewStartResponse(BaseModel):
     session_id: str
     domain: str
     question: str
+    degraded: bool = False
 
 
 class InterviewMessageRequest(BaseModel):
@@ -79,6 +82,7 @@ class InterviewMessageResponse(BaseModel):
     next_question: str | None = None
     completed: bool = False
     history: List[Dict[str, str]] = []
+    degraded: bool = False
 
 
 _SESSIONS: Dict[str, Dict[str, object]] = {}
@@ -179,6 +183,7 @@ async def start_session(
     jd_text: str = Form(default=""),
     job_id: int | None = Form(default=None),
     jd_file: UploadFile | None = File(default=None),
+    budget: float = Depends(get_latency_budget),
     current_user: dict = Depends(require_roles("student", "admin")),
 ):
     parsed_payload: InterviewStartRequest | None = None
@@ -225,14 +230,18 @@ async def start_session(
         )
 
     questions = _generate_questions_from_jd(combined_jd_text, domain)
+    jd_summary = summarize_jd_for_prompt(combined_jd_text)
+    degraded = False
     if gemini_available():
-        jd_summary = summarize_jd_for_prompt(combined_jd_text)
-        llm_questions = generate_interview_questions_from_gemini(
-            jd_summary, domain, num_questions=5
+        llm_questions, degraded = await call_with_budget_async(
+            generate_interview_questions_from_gemini,
+            jd_summary,
+            domain,
+            num_questions=5,
+            budget=budget,
         )
         if llm_questions:
             questions = llm_questions
-    jd_summary = summarize_jd_for_prompt(combined_jd_text)
     session_id = uuid4().hex
     _SESSIONS[session_id] = {
         "domain": domain,
@@ -243,13 +252,16 @@ async def start_session(
         "jd_text": jd_summary,
     }
     first_question = questions[0]
-    return InterviewStartResponse(session_id=session_id, domain=domain, question=first_question)
+    return InterviewStartResponse(
+        session_id=session_id, domain=domain, question=first_question, degraded=degraded
+    )
 
 
 @router.post("/session/{session_id}/message", response_model=InterviewMessageResponse)
 def send_message(
     session_id: str,
     payload: InterviewMessageRequest,
+    budget: float = Depends(get_latency_budget),
     current_user: dict = Depends(require_roles("student", "admin")),
 ):
     session = _SESSIONS.get(session_id)
@@ -284,16 +296,17 @@ def send_message(
 
     jd_summary = session.get("jd_text", "")  # type: ignore[assignment]
 
-    feedback_data = (
-        generate_interview_feedback_with_gemini(
+    feedback_data = None
+    degraded = False
+    if gemini_available():
+        feedback_data, degraded = call_with_budget(
+            generate_interview_feedback_with_gemini,
             current_question,
             payload.answer,
             jd_summary,
             session["domain"],  # type: ignore[arg-type]
+            budget=budget,
         )
-        if gemini_available()
-        else None
-    )
 
     if feedback_data:
         feedback = InterviewFeedback(
@@ -332,4 +345,5 @@ def send_message(
         next_question=next_question,
         completed=completed,
         history=session["history"],  # type: ignore[arg-type]
+        degraded=degraded,
     )
@@ -1,8 +1,7 @@
 from __future__ import annotations
 
-import hashlib
-import shutil
 import json
+import shutil
 from pathlib import Path
 from uuid import uuid4
 
@@ -17,28 +16,27 @@ from fastapi import (
     Response,
     Query,
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
 from app.core import config
-from app.core.deps import get_current_user, require_roles
+from app.core.deps import get_current_user, get_latency_budget, require_roles
+from app.core.db import run_in_db
+from app.dao import async_dao
 from app.schemas.schemas import (
     JobDescriptionRequest,
     JobDescriptionResponse,
     JobUpdateStatus,
 )
 from app.dao.jobs_dao import (
-    create_job,
     get_job_by_id,
     get_pending_jobs,
-    list_jobs,
-    list_review_history,
-    update_job,
-    update_job_status,
     delete_job as delete_job_record,
 )
-from app.dao.processed_dao import list_job_ids_by_email
 from app.services.cv_service import extract_text_generic_from_bytes
 from app.services.gemini_service import (
+    call_with_budget,
+    call_with_budget_async,
     generate_job_description_with_gemini,
     gemini_available,
     generate_interview_questions_from_gemini,
@@ -46,8 +44,13 @@ from app.services.gemini_service import (
 )
 from app.services.skills_service import extract_skills
 from app.services import profile_service
-from app.services.cv_matching_service import build_cv_analysis
-from app.services import profile_match_service
+from app.services.cv_matching_service import get_cv_features
+from app.services import profile_match_service, profile_ranking_service, ranking_snapshot_service
+from app.services import skill_graph_service
+from app.services import dedup_service
+from app.services import precompute_service
+from app.services import candidate_search_service
+from app.dao.processed_dao import list_applicant_user_ids
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
@@ -59,6 +62,7 @@ def serialize_job(job: dict | None) -> dict | None:
     if not job:
         return None
     job = dict(job)
+    job.pop("jd_minhash", None)
     attachment_path = job.pop("jd_file_path", None)
     attachment_name = job.pop("jd_file_name", None)
     job["has_attachment"] = bool(attachment_path)
@@ -162,126 +166,233 @@ def _fallback_jd(payload: JobDescriptionRequest) -> str:
 
 
 @router.get("")
-def get_jobs(current_user: dict = Depends(get_current_user)):
+async def get_jobs(current_user: dict = Depends(get_current_user)):
     role = current_user.get("role")
     if role == "employer":
-        jobs = list_jobs(published_only=False, employer_id=current_user["id"])
+        jobs = await async_dao.jobs.list_jobs(published_only=False, employer_id=current_user["id"])
     elif role == "student":
-        jobs = list_jobs(published_only=True)
+        jobs = await async_dao.jobs.list_jobs(published_only=True)
     else:
-        jobs = list_jobs(published_only=False)
+        jobs = await async_dao.jobs.list_jobs(published_only=False)
     return [serialize_job(job) for job in jobs]
 
+def _require_active_cv(user_id: int) -> dict:
+    active_cv = profile_service.get_active_cv(user_id)
+    if not active_cv:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Please add a CV to My Profile and set it as active before using this filter.",
+        )
+    return active_cv
+
+
 @router.get("/profile-match")
 def get_jobs_profile_match(
+    response: Response,
     limit: int = Query(default=20, ge=1, le=100),
+    oversample: int = Query(default=config.PROFILE_MATCH_OVERSAMPLE, ge=1, le=10),
+    cursor: str | None = Query(default=None, description="Opaque X-Next-Cursor from a previous page"),
+    budget: float = Depends(get_latency_budget),
     current_user: dict = Depends(require_roles("student")),
 ):
-    draft = profile_service.get_active_draft(current_user["id"])
-    cv_text = ""
-    cv_label = ""
-    cv_source = ""
-    if draft:
-        cv_text = profile_service.draft_to_plaintext(draft).strip()
-        cv_source = f"draft:{draft['id']}"
+    """Ranked jobs for the active CV, one page at a time.
+
+    The first page ranks (or reuses a stored ranking snapshot); follow-up
+    pages are read from that snapshot via the cursor returned in the
+    ``X-Next-Cursor`` header. A cursor stops working (410) once the active
+    CV or the job set changes.
+    """
+    user_id = current_user["id"]
+    active_cv = _require_active_cv(user_id)
+    features = get_cv_features(active_cv["text"])
+    page = None
+    if cursor:
         try:
-            data = json.loads(draft.get("data_json") or "{}")
-        except Exception:
-            data = {}
-        cv_label = (
-            (draft.get("draft_title") or "").strip()
-            or (data.get("name") or "").strip()
-            or f"Draft #{draft['id']}"
-        )
+            snapshot_id, offset = ranking_snapshot_service.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+        snapshot = ranking_snapshot_service.get_snapshot(snapshot_id, user_id)
+        if not snapshot or not ranking_snapshot_service.is_current(snapshot, features.cv_hash):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Job matches have changed. Please reload from the first page.",
+            )
+        entries = snapshot["entries"]
     else:
-        uploaded = profile_service.get_active_uploaded_cv(current_user["id"])
-        if uploaded:
-            cv_text = profile_service.uploaded_cv_plaintext(uploaded)
-            cv_source = f"uploaded:{uploaded['id']}"
-            cv_label = (uploaded.get("name") or "Uploaded CV").strip()
-    if not cv_text:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Please add a CV to My Profile and set it as active before using this filter.",
+        offset = 0
+        version, jobs = profile_ranking_service.versioned_candidate_jobs(current_user)
+        snapshot = ranking_snapshot_service.find_current(
+            user_id, features.cv_hash, [job["id"] for job in jobs]
         )
-    cv_hash = hashlib.sha256(cv_text.encode("utf-8")).hexdigest()
-    jobs = list_jobs(published_only=True)
-    email = (current_user.get("email") or "").strip()
-    if email:
-        applied_ids = set(list_job_ids_by_email(email))
-        if applied_ids:
-            jobs = [job for job in jobs if job.get("id") not in applied_ids]
-    scored_jobs = []
-    for job in jobs:
-        cached = profile_match_service.get_cached_match(current_user["id"], job["id"], cv_hash)
-        if cached:
-            analysis = cached
-            score = float(analysis.get("score", 0.0) or 0.0)
+        if snapshot:
+            snapshot_id, entries = snapshot["id"], snapshot["entries"]
         else:
-            analysis_dict = build_cv_analysis(cv_text, job).dict()
-            score = round(
-                (float(analysis_dict.get("coverage", 0.0)) + float(analysis_dict.get("similarity", 0.0))) / 2.0,
-                4,
-            )
-            profile_match_service.save_match(
-                current_user["id"],
-                job["id"],
-                cv_hash,
-                score,
-                float(analysis_dict.get("coverage", 0.0)),
-                float(analysis_dict.get("similarity", 0.0)),
-                analysis_dict,
-                cv_source=cv_source,
-                cv_label=cv_label,
+            snapshot_id, entries, ranked = profile_ranking_service.rank_and_snapshot(
+                current_user,
+                features,
+                jobs,
+                version,
+                limit=limit,
+                oversample=oversample,
+                budget=budget,
+                cv_source=active_cv["source"],
+                cv_label=active_cv["label"],
             )
-            analysis = {**analysis_dict, "score": score}
-        serialized = serialize_job(job) or {}
-        scored_jobs.append(
-            {
-                **serialized,
-                "match": {
-                    **analysis,
-                    "score": score,
-                },
-            }
+            page = ranked[:limit]
+    if page is None:
+        page = profile_ranking_service.matches_for_job_ids(
+            user_id, features, [entry[0] for entry in entries[offset : offset + limit]]
         )
-    scored_jobs.sort(key=lambda item: item["match"]["score"], reverse=True)
-    return scored_jobs[:limit]
+    if offset + limit < len(entries):
+        response.headers["X-Next-Cursor"] = ranking_snapshot_service.encode_cursor(
+            snapshot_id, offset + limit
+        )
+    return [{**(serialize_job(job) or {}), "match": match} for job, match in page]
+
+
+@router.get("/profile-match/stream")
+async def stream_jobs_profile_match(
+    limit: int = Query(default=20, ge=1, le=100),
+    oversample: int = Query(default=config.PROFILE_MATCH_OVERSAMPLE, ge=1, le=10),
+    budget: float = Depends(get_latency_budget),
+    current_user: dict = Depends(require_roles("student")),
+):
+    """NDJSON variant of /profile-match.
+
+    Emits ``{"type": "match"}`` lines as scores arrive (cached first, then
+    deterministic, then enriched), a ``{"type": "top"}`` snapshot of the
+    current top ``limit`` job IDs whenever it changes, and a final
+    ``{"type": "done"}``.
+    """
+    active_cv = await run_in_threadpool(_require_active_cv, current_user["id"])
+    features = await run_in_threadpool(get_cv_features, active_cv["text"])
+    jobs = await run_in_threadpool(profile_ranking_service.candidate_jobs, current_user)
+    matches = iterate_in_threadpool(
+        profile_ranking_service.iter_matches(
+            current_user["id"],
+            features,
+            jobs,
+            limit=limit,
+            oversample=oversample,
+            budget=budget,
+            cv_source=active_cv["source"],
+            cv_label=active_cv["label"],
+        )
+    )
+
+    async def _lines():
+        latest: dict = {}
+        last_top: list = []
+        async for job, match in matches:
+            latest[job["id"]] = (job, match)
+            yield json.dumps({"type": "match", "job": serialize_job(job), "match": match}) + "\n"
+            # The top list can only change if this job is already in it (its
+            # score may drop) or reaches the current k-th score.
+            if (
+                len(last_top) >= limit
+                and match["score"] < last_top[-1]["score"]
+                and all(item["job_id"] != job["id"] for item in last_top)
+            ):
+                continue
+            top = [
+                {"job_id": top_job["id"], "score": top_match["score"], "stage": top_match["stage"]}
+                for top_job, top_match in profile_ranking_service.top_matches(latest, limit)
+            ]
+            if top != last_top:
+                last_top = top
+                yield json.dumps({"type": "top", "items": top}) + "\n"
+        yield json.dumps({"type": "done", "total": len(latest)}) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
 
 
 @router.get("/profile-match/history")
-def list_profile_match_history(
+async def list_profile_match_history(
     limit: int = Query(default=50, ge=1, le=200),
     current_user: dict = Depends(require_roles("student")),
 ):
-    history = profile_match_service.list_history(current_user["id"], limit)
+    history = await async_dao.profile_matches.list_history(current_user["id"], limit)
     return history
 
 
 @router.delete("/profile-match/history")
-def clear_profile_match_history(current_user: dict = Depends(require_roles("student"))):
-    profile_match_service.clear_history(current_user["id"])
+async def clear_profile_match_history(current_user: dict = Depends(require_roles("student"))):
+    await async_dao.profile_matches.clear_history(current_user["id"])
+    await run_in_db(ranking_snapshot_service.clear_snapshots, current_user["id"])
     return {"status": "cleared"}
 
 
 @router.get("/history")
-def get_history(_: dict = Depends(require_roles("admin"))):
-    return [serialize_job(job) for job in list_review_history()]
+async def get_history(_: dict = Depends(require_roles("admin"))):
+    return [serialize_job(job) for job in await async_dao.jobs.list_review_history()]
 
 
 @router.get("/pending")
 def get_pending(_: dict = Depends(require_roles("admin"))):
-    return [serialize_job(job) for job in get_pending_jobs()]
+    pending = []
+    for job in get_pending_jobs():
+        duplicates = dedup_service.find_duplicate_jobs(
+            job["id"], job.get("jd_text") or "", blob=job.get("jd_minhash")
+        )
+        pending.append(
+            {
+                **(serialize_job(job) or {}),
+                "possible_duplicates": [job_id for job_id, _ in duplicates],
+            }
+        )
+    return pending
 
 
 @router.get("/{job_id}")
-def get_job(job_id: int):
-    job = get_job_by_id(job_id)
+async def get_job(job_id: int):
+    job = await async_dao.jobs.get_job_by_id(job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
     return serialize_job(job)
 
 
+@router.get("/{job_id}/duplicates")
+def get_job_duplicates(
+    job_id: int,
+    threshold: float = Query(default=dedup_service.DUPLICATE_THRESHOLD, ge=0.5, le=1.0),
+    _: dict = Depends(require_roles("admin")),
+):
+    job = get_job_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    results = []
+    for duplicate_id, similarity in dedup_service.find_duplicate_jobs(
+        job_id, job.get("jd_text") or "", threshold, blob=job.get("jd_minhash")
+    ):
+        duplicate = get_job_by_id(duplicate_id)
+        if duplicate:
+            results.append({"job": serialize_job(duplicate), "similarity": similarity})
+    return results
+
+
+@router.get("/{job_id}/candidates")
+def get_job_candidates(
+    job_id: int,
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    current_user: dict = Depends(require_roles("admin", "employer")),
+):
+    """Opted-in students whose active CV best fits this job, excluding
+    students who already applied."""
+    job = get_job_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if current_user["role"] == "employer" and job.get("employer_id") != current_user["id"]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your job")
+    ranked, total = candidate_search_service.top_candidates(
+        job, offset + limit, exclude_user_ids=list_applicant_user_ids(job_id)
+    )
+    return {
+        "total": total,
+        "items": candidate_search_service.analyse_candidates(job, ranked[offset:]),
+    }
+
+
 @router.get("/{job_id}/attachment")
 def download_job_attachment(job_id: int, _: dict = Depends(get_current_user)):
     job = get_job_by_id(job_id)
@@ -306,6 +417,7 @@ async def post_job(
 ):
     employer_id = current_user["id"] if current_user["role"] == "employer" else None
     file_path, file_name = save_attachment(jd_file)
+    jd_minhash = await run_in_threadpool(dedup_service.signature_blob, jd_text)
     job_data = {
         "title": title,
         "company_name": company_name,
@@ -314,8 +426,11 @@ async def post_job(
         "coverage_threshold": coverage_threshold,
         "jd_file_path": file_path,
         "jd_file_name": file_name,
+        "jd_minhash": jd_minhash,
     }
-    job_id = create_job(job_data, employer_id=employer_id)
+    job_id = await async_dao.jobs.create_job(job_data, employer_id=employer_id)
+    await run_in_threadpool(skill_graph_service.index_job, job_id, jd_text)
+    await run_in_threadpool(dedup_service.index_job, job_id, jd_minhash)
     return {"id": job_id}
 
 
@@ -331,19 +446,21 @@ async def put_job(
     jd_file: UploadFile | None = File(None),
     current_user: dict = Depends(require_roles("admin", "employer")),
 ):
-    job = get_job_by_id(job_id)
+    job = await async_dao.jobs.get_job_by_id(job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
     if current_user["role"] == "employer" and job.get("employer_id") != current_user["id"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to modify this job.")
 
     new_file_path, new_file_name = save_attachment(jd_file)
+    jd_minhash = await run_in_threadpool(dedup_service.signature_blob, jd_text)
     updates = {
         "title": title,
         "company_name": company_name,
         "jd_text": jd_text,
         "hr_email": hr_email,
         "coverage_threshold": float(coverage_threshold),
+        "jd_minhash": jd_minhash,
     }
     cleanup_paths: list[Path] = []
 
@@ -358,7 +475,7 @@ async def put_job(
         cleanup_paths.append(Path(job["jd_file_path"]))
 
     try:
-        updated = update_job(job_id, updates)
+        updated = await async_dao.jobs.update_job(job_id, updates)
     except Exception:
         if new_file_path:
             try:
@@ -381,17 +498,19 @@ async def put_job(
         except OSError:
             pass
 
-    updated_job = get_job_by_id(job_id)
+    await run_in_threadpool(skill_graph_service.index_job, job_id, jd_text)
+    await run_in_threadpool(dedup_service.index_job, job_id, jd_minhash)
+    updated_job = await async_dao.jobs.get_job_by_id(job_id)
     return serialize_job(updated_job)
 
 
 @router.patch("/{job_id}/status")
-def patch_job_status(
+async def patch_job_status(
     job_id: int,
     payload: JobUpdateStatus,
     current_user: dict = Depends(require_roles("admin")),
 ):
-    job = get_job_by_id(job_id)
+    job = await async_dao.jobs.get_job_by_id(job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
 
@@ -410,7 +529,7 @@ def patch_job_status(
     if new_status == "approved":
         rejection_reason = ""
 
-    updated = update_job_status(
+    updated = await async_dao.jobs.update_job_status(
         job_id,
         status=new_status,
         rejection_reason=rejection_reason,
@@ -421,6 +540,8 @@ def patch_job_status(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to update job status.",
         )
+    if new_status == "approved":
+        precompute_service.enqueue_job(job_id)
     return {"status": new_status}
 
 
@@ -428,22 +549,23 @@ def patch_job_status(
 @router.post("/generate-jd", response_model=JobDescriptionResponse)
 def generate_job_description(
     payload: JobDescriptionRequest,
+    budget: float = Depends(get_latency_budget),
     current_user: dict = Depends(require_roles("admin", "employer")),
 ):
     prompt = _build_jd_prompt(payload)
     jd_text = None
     source = "fallback"
+    degraded = False
     if gemini_available():
-        try:
-            jd_text = generate_job_description_with_gemini(prompt)
-            if jd_text:
-                source = "gemini"
-        except Exception:
-            jd_text = None
+        jd_text, degraded = call_with_budget(
+            generate_job_description_with_gemini, prompt, budget=budget
+        )
+        if jd_text:
+            source = "gemini"
     if not jd_text:
         jd_text = _fallback_jd(payload)
         source = "fallback"
-    return JobDescriptionResponse(jd_text=jd_text, source=source)
+    return JobDescriptionResponse(jd_text=jd_text, source=source, degraded=degraded)
 
 
 def _fallback_questions(jd_text: str, domain: str) -> list[str]:
@@ -480,6 +602,7 @@ async def generate_job_interview_questions(
     domain: str = Form("behavioral"),
     jd_text: str = Form(""),
     jd_file: UploadFile | None = File(None),
+    budget: float = Depends(get_latency_budget),
     current_user: dict = Depends(require_roles("admin", "employer")),
 ):
     domain = (domain or "behavioral").lower()
@@ -523,19 +646,19 @@ async def generate_job_interview_questions(
 
     questions: list[str] | None = None
     source = "fallback"
+    degraded = False
     if gemini_available():
-        try:
-            summary = summarize_jd_for_prompt(combined_text)
-            ai_questions = generate_interview_questions_from_gemini(
-                summary,
-                domain=domain,
-                num_questions=5,
-            )
-            if ai_questions:
-                questions = ai_questions[:5]
-                source = "gemini"
-        except Exception:
-            questions = None
+        summary = summarize_jd_for_prompt(combined_text)
+        ai_questions, degraded = await call_with_budget_async(
+            generate_interview_questions_from_gemini,
+            summary,
+            domain=domain,
+            num_questions=5,
+            budget=budget,
+        )
+        if ai_questions:
+            questions = ai_questions[:5]
+            source = "gemini"
 
     if not questions:
         questions = _fallback_questions(combined_text, domain)
@@ -543,6 +666,7 @@ async def generate_job_interview_questions(
     return {
         "questions": questions,
         "source": source,
+        "degraded": degraded,
     }
 
 
@@ -560,6 +684,8 @@ def delete_job(
     deleted = delete_job_record(job_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to delete job.")
+    skill_graph_service.remove_job(job_id)
+    dedup_service.remove_job(job_id)
 
     file_path = job.get("jd_file_path")
     if file_path:
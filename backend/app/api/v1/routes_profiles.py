@@ -6,8 +6,10 @@ from io import BytesIO
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.core.deps import get_current_user, require_roles
+from app.dao import async_dao
 from app.schemas.schemas import (
     ProfileDraftOut,
     ProfileDraftSummary,
@@ -16,9 +18,16 @@ from app.schemas.schemas import (
     ProfileTemplateOut,
     ProfileUpdateRequest,
     ProfileUploadedActivateRequest,
+    OpenToMatchingRequest,
     UploadedCvSummary,
 )
-from app.services import pdf_service, profile_service, profile_templates
+from app.services import (
+    candidate_search_service,
+    pdf_service,
+    precompute_service,
+    profile_service,
+    profile_templates,
+)
 
 router = APIRouter(prefix="/profiles", tags=["profiles"])
 
@@ -65,31 +74,34 @@ def get_templates(_: dict = Depends(get_current_user)):
 
 
 @router.get("/drafts", response_model=List[ProfileDraftSummary])
-def list_my_drafts(current_user: dict = Depends(get_current_user)):
-    drafts = profile_service.list_drafts(current_user["id"])
+async def list_my_drafts(current_user: dict = Depends(get_current_user)):
+    drafts = await async_dao.profiles.list_drafts(current_user["id"])
     return [_draft_to_summary(row) for row in drafts]
 
 @router.get("/drafts/active", response_model=Optional[ProfileDraftSummary])
-def get_active_profile_draft(current_user: dict = Depends(get_current_user)):
-    draft = profile_service.get_active_draft(current_user["id"])
+async def get_active_profile_draft(current_user: dict = Depends(get_current_user)):
+    draft = await async_dao.profiles.get_active_draft(current_user["id"])
     if not draft:
         return None
     return _draft_to_summary(draft)
 
 @router.post("/drafts/{draft_id}/activate", response_model=ProfileDraftSummary)
-def activate_profile_draft(
+async def activate_profile_draft(
     draft_id: int,
     current_user: dict = Depends(get_current_user),
 ):
-    draft = profile_service.set_active_draft(current_user["id"], int(draft_id))
+    draft = await async_dao.profiles.set_active_draft(current_user["id"], int(draft_id))
     if not draft:
         raise HTTPException(status_code=404, detail="Draft not found.")
+    await run_in_threadpool(candidate_search_service.refresh_candidate, current_user["id"])
+    precompute_service.enqueue_cv(current_user["id"])
     return _draft_to_summary(draft)
 
 
 @router.post("/drafts/active/clear")
 def clear_active_profile_draft(current_user: dict = Depends(get_current_user)):
     profile_service.clear_active_draft(current_user["id"])
+    candidate_search_service.refresh_candidate(current_user["id"])
     return {"status": "cleared"}
 
 @router.post("/uploaded/activate")
@@ -105,13 +117,15 @@ def activate_uploaded_cv(
             request.data_url,
         )
         profile_service.set_active_uploaded_cv(current_user["id"], uploaded_id)
+        candidate_search_service.refresh_candidate(current_user["id"])
+        precompute_service.enqueue_cv(current_user["id"])
         return {"uploaded_id": uploaded_id}
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 @router.get("/uploaded/active", response_model=Optional[UploadedCvSummary])
-def get_active_uploaded_cv(current_user: dict = Depends(get_current_user)):
-    uploaded = profile_service.get_active_uploaded_cv(current_user["id"])
+async def get_active_uploaded_cv(current_user: dict = Depends(get_current_user)):
+    uploaded = await async_dao.profiles.get_active_uploaded_cv(current_user["id"])
     if not uploaded:
         return None
     return UploadedCvSummary(
@@ -123,9 +137,25 @@ def get_active_uploaded_cv(current_user: dict = Depends(get_current_user)):
 @router.post("/uploaded/clear")
 def clear_active_uploaded_cv(current_user: dict = Depends(get_current_user)):
     profile_service.clear_active_uploaded_cv(current_user["id"])
+    candidate_search_service.refresh_candidate(current_user["id"])
     return {"status": "cleared"}
 
 
+@router.get("/open-to-matching")
+async def get_open_to_matching(current_user: dict = Depends(require_roles("student"))):
+    return {"enabled": bool(current_user.get("open_to_matching"))}
+
+
+@router.put("/open-to-matching")
+def update_open_to_matching(
+    request: OpenToMatchingRequest,
+    current_user: dict = Depends(require_roles("student")),
+):
+    """Opt in to (or out of) being suggested to employers for their jobs."""
+    candidate_search_service.set_open_to_matching(current_user["id"], request.enabled)
+    return {"enabled": request.enabled}
+
+
 @router.post("/generate", response_model=ProfileDraftOut)
 def generate_profile(
     request: ProfileGenerateRequest,
@@ -166,11 +196,11 @@ def generate_profile(
 
 
 @router.get("/{draft_id}", response_model=ProfileDraftOut)
-def fetch_profile(
+async def fetch_profile(
     draft_id: int,
     current_user: dict = Depends(get_current_user),
 ):
-    draft = profile_service.get_draft(draft_id, current_user["id"])
+    draft = await async_dao.profiles.get_draft(draft_id, current_user["id"])
     if not draft:
         raise HTTPException(status_code=404, detail="Draft not found.")
     return _draft_to_out(draft)
@@ -191,6 +221,10 @@ def update_profile(
     )
     if not updated:
         raise HTTPException(status_code=404, detail="Draft not found.")
+    active = profile_service.get_active_draft(current_user["id"])
+    if active and active.get("id") == updated.get("id"):
+        candidate_search_service.refresh_candidate(current_user["id"])
+        precompute_service.enqueue_cv(current_user["id"])
     return _draft_to_out(updated)
 
 
@@ -8,7 +8,27 @@ DB_CANDIDATES = [
     os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "jobs.db")),
 ]
 
-DB_PATH = next((p for p in DB_CANDIDATES if os.path.exists(p)), DB_CANDIDATES[0])
+DB_PATH = os.getenv("DB_PATH") or next(
+    (p for p in DB_CANDIDATES if os.path.exists(p)), DB_CANDIDATES[0]
+)
+# Pragmas applied to every SQLite connection when it is opened.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+# Apply pending schema migrations on startup; when off, startup fails if the
+# schema is behind (run `python -m app.core.migrations` during deployment).
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "1") == "1"
+# Threads of the dedicated executor behind the async DAO layer.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+SKILL_GRAPH_PATH = os.getenv(
+    "SKILL_GRAPH_PATH",
+    os.path.join(os.path.dirname(DB_PATH), "skill_graph.npz"),
+)
+# Seconds a skill-graph change may wait before the file is rewritten.
+SKILL_GRAPH_SAVE_DELAY = float(os.getenv("SKILL_GRAPH_SAVE_DELAY", "30"))
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 GMAIL_USER = os.getenv("GMAIL_USER", "")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD", "")
@@ -34,7 +54,30 @@ CV_UPLOAD_DIR = os.getenv(
         os.path.join(os.path.dirname(__file__), "..", "..", "uploads", "cv")
     ),
 )
+COURSE_CATALOG_PATH = os.getenv(
+    "COURSE_CATALOG_PATH",
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "assets", "courses.jsonl")
+    ),
+)
 GEMINI_MODEL_INTERVIEW = os.getenv("GEMINI_MODEL_INTERVIEW", "gemini-2.5-flash")
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+# In-flight Gemini calls one request may hold in the shared pool.
+GEMINI_PER_REQUEST_CONCURRENCY = int(os.getenv("GEMINI_PER_REQUEST_CONCURRENCY", "4"))
+# Profile matching enriches only the top limit * oversample deterministic hits.
+PROFILE_MATCH_OVERSAMPLE = int(os.getenv("PROFILE_MATCH_OVERSAMPLE", "2"))
+# Background profile-match precompute (CV activation, job approval).
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "1") == "1"
+# Gemini calls the precompute worker may start per minute (0 = unthrottled).
+PRECOMPUTE_GEMINI_CALLS_PER_MINUTE = float(os.getenv("PRECOMPUTE_GEMINI_CALLS_PER_MINUTE", "30"))
+PRECOMPUTE_QUEUE_MAX = int(os.getenv("PRECOMPUTE_QUEUE_MAX", "1000"))
+PRECOMPUTE_RANK_LIMIT = int(os.getenv("PRECOMPUTE_RANK_LIMIT", "20"))
+ANALYSIS_JOB_TTL_SECONDS = int(os.getenv("ANALYSIS_JOB_TTL_SECONDS", "900"))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "2048"))
+FEATURE_CACHE_MAX_ENTRIES = int(os.getenv("FEATURE_CACHE_MAX_ENTRIES", "512"))
+AI_LATENCY_BUDGET_MS = int(os.getenv("AI_LATENCY_BUDGET_MS", "8000"))
+AI_LATENCY_BUDGET_MAX_MS = int(os.getenv("AI_LATENCY_BUDGET_MAX_MS", "60000"))
 CV_TEMPLATE_DIR = os.getenv(
     "CV_TEMPLATE_DIR",
     os.path.abspath(
@@ -1,187 +1,139 @@
+import asyncio
+import functools
+import logging
 import sqlite3
-from typing import Iterator
-from app.core.config import DB_PATH
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+from app.core.config import (
+    DB_EXECUTOR_WORKERS,
+    DB_PATH,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_TEMP_STORE,
+)
 
-def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+# One connection per thread, reused across calls. _CONNECTIONS tracks them
+# so connections of finished threads can be closed and close_connections()
+# can release everything at shutdown. Bumping _GENERATION makes threads
+# drop connections closed by close_connections() and open new ones.
+_LOCAL = threading.local()
+_CONNECTIONS: Dict[threading.Thread, sqlite3.Connection] = {}
+_CONNECTIONS_LOCK = threading.Lock()
+_GENERATION = 0
+
+# Async callers run blocking DB work here instead of the shared threadpool,
+# which stays free for CPU-bound matching. Each worker keeps its own
+# connection via get_connection().
+_DB_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_DB_EXECUTOR_LOCK = threading.Lock()
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+def _keyword(value: str) -> str:
+    if not value.isalpha():
+        raise ValueError(f"Invalid SQLite pragma value: {value!r}")
+    return value.upper()
+
+
+def _open_connection() -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0, check_same_thread=False
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA journal_mode={_keyword(SQLITE_JOURNAL_MODE)}")
+    conn.execute(f"PRAGMA synchronous={_keyword(SQLITE_SYNCHRONOUS)}")
+    conn.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size={-abs(int(SQLITE_CACHE_SIZE_KB))}")
+    conn.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA temp_store={_keyword(SQLITE_TEMP_STORE)}")
     return conn
 
-def migrate(conn: sqlite3.Connection):
-    cur = conn.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        email TEXT UNIQUE,
-        password_hash TEXT,
-        role TEXT,
-        created_at TEXT,
-        is_banned INTEGER DEFAULT 0,
-        banned_reason TEXT DEFAULT '',
-        banned_at TEXT
-    )""")
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS jobs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT,
-        company_name TEXT DEFAULT '',
-        jd_text TEXT DEFAULT '',
-        hr_email TEXT DEFAULT '',
-        created_at TEXT,
-        status TEXT DEFAULT 'pending',
-        admin_approved_by INTEGER,
-        published INTEGER DEFAULT 0,
-        coverage_threshold REAL DEFAULT 0.6,
-        employer_id INTEGER,
-        rejection_reason TEXT DEFAULT '',
-        reviewed_at TEXT,
-        jd_file_path TEXT,
-        jd_file_name TEXT DEFAULT ''
-    )""")
-    try:
-        cur.execute("ALTER TABLE jobs ADD COLUMN rejection_reason TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE jobs ADD COLUMN reviewed_at TEXT")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE jobs ADD COLUMN jd_file_path TEXT")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE jobs ADD COLUMN jd_file_name TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN is_banned INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN banned_reason TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN banned_at TEXT")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN active_profile_draft_id INTEGER")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE users ADD COLUMN active_uploaded_cv_id INTEGER")
-    except sqlite3.OperationalError:
-        pass
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS profile_match_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        job_id INTEGER NOT NULL,
-        cv_hash TEXT NOT NULL,
-        score REAL,
-        coverage REAL,
-        similarity REAL,
-        analysis_json TEXT,
-        created_at TEXT,
-        cv_source TEXT DEFAULT '',
-        cv_label TEXT DEFAULT ''
-    )""")
-    try:
-        cur.execute("ALTER TABLE profile_match_history ADD COLUMN cv_source TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE profile_match_history ADD COLUMN cv_label TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_match_history_user ON profile_match_history(user_id)")
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS processed (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        email TEXT,
-        uploaded_filename TEXT,
-        job_id INTEGER,
-        jd_summary TEXT,
-        coverage REAL,
-        similarity REAL,
-        missing TEXT,
-        passed INTEGER,
-        hr_email TEXT,
-        sent_email INTEGER DEFAULT 0,
-        predicted_role TEXT,
-        company_name TEXT,
-        job_title TEXT,
-        hr_name TEXT,
-        interview_mode TEXT,
-        schedule_link TEXT,
-        created_at TEXT,
-        invite_sent_at TEXT,
-        invite_subject TEXT DEFAULT '',
-        invite_message TEXT DEFAULT '',
-        cv_text TEXT DEFAULT '',
-        uploaded_file_path TEXT DEFAULT ''
-    )""")
-    try:
-        cur.execute("ALTER TABLE processed ADD COLUMN invite_sent_at TEXT")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE processed ADD COLUMN invite_subject TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE processed ADD COLUMN invite_message TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE processed ADD COLUMN cv_text TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE processed ADD COLUMN uploaded_file_path TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS profile_drafts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        field TEXT DEFAULT '',
-        position TEXT DEFAULT '',
-        style TEXT DEFAULT '',
-        language TEXT DEFAULT '',
-        template_id TEXT DEFAULT '',
-        schema_version TEXT DEFAULT '',
-        template_version TEXT DEFAULT '',
-        data_json TEXT,
-        blocks_json TEXT,
-        created_at TEXT,
-        updated_at TEXT
-    )""")
-    try:
-        cur.execute("ALTER TABLE profile_drafts ADD COLUMN language TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cur.execute("ALTER TABLE profile_drafts ADD COLUMN blocks_json TEXT")
-    except sqlite3.OperationalError:
-        pass
+
+def get_connection() -> sqlite3.Connection:
+    """The calling thread's connection, opened (with the pragma profile) on first use.
+
+    Callers commit their own writes, and units of work (``run_in_db``, the
+    precompute worker) end with ``release_connection``. A transaction still
+    open here was either left behind by a failed call on a thread without such
+    a boundary, or belongs to a caller that is mid-write; both are bugs, so it
+    is logged with the calling stack before being rolled back.
+    """
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None and _LOCAL.generation == _GENERATION:
+        if conn.in_transaction:
+            logger.warning(
+                "Rolling back a transaction left open on this thread's connection",
+                stack_info=True,
+            )
+            conn.rollback()
+        return conn
+    conn = _open_connection()
+    _LOCAL.conn, _LOCAL.generation = conn, _GENERATION
+    with _CONNECTIONS_LOCK:
+        for thread in [t for t in _CONNECTIONS if not t.is_alive()]:
+            _CONNECTIONS.pop(thread).close()
+        _CONNECTIONS[threading.current_thread()] = conn
+    return conn
+
+
+def release_connection() -> None:
+    """End of a unit of work: roll back anything the calling thread's
+    connection left uncommitted (a call that failed before its commit), so the
+    thread does not keep holding the write lock while idle."""
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None and _LOCAL.generation == _GENERATION and conn.in_transaction:
+        conn.rollback()
+
+
+def _in_unit_of_work(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
     try:
-        cur.execute("ALTER TABLE profile_drafts ADD COLUMN draft_title TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS uploaded_cvs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        name TEXT DEFAULT '',
-        mime TEXT DEFAULT '',
-        data_json TEXT,
-        created_at TEXT,
-        updated_at TEXT
-    )""")
-    conn.commit()
+        return fn(*args, **kwargs)
+    finally:
+        release_connection()
+
+
+def _db_executor() -> ThreadPoolExecutor:
+    global _DB_EXECUTOR
+    with _DB_EXECUTOR_LOCK:
+        if _DB_EXECUTOR is None:
+            _DB_EXECUTOR = ThreadPoolExecutor(
+                max_workers=max(1, DB_EXECUTOR_WORKERS), thread_name_prefix="db"
+            )
+        return _DB_EXECUTOR
+
+
+async def run_in_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a blocking DB function on the dedicated DB executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _db_executor(), functools.partial(_in_unit_of_work, fn, *args, **kwargs)
+    )
+
+
+def shutdown_db_executor() -> None:
+    global _DB_EXECUTOR
+    with _DB_EXECUTOR_LOCK:
+        executor, _DB_EXECUTOR = _DB_EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def close_connections() -> None:
+    """Close every pooled connection (application shutdown)."""
+    global _GENERATION
+    with _CONNECTIONS_LOCK:
+        _GENERATION += 1
+        connections = list(_CONNECTIONS.values())
+        _CONNECTIONS.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
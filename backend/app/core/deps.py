@@ -1,15 +1,16 @@
-from typing import Any, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from app.core.config import AI_LATENCY_BUDGET_MAX_MS, AI_LATENCY_BUDGET_MS
 from app.core.security import AuthError, decode_token
-from app.dao import users_dao
+from app.dao import async_dao
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     try:
         payload = decode_token(token)
     except AuthError:
@@ -23,7 +24,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token missing subject.",
         )
-    user = users_dao.get_user_by_id(int(user_id))
+    user = await async_dao.users.get_user_by_id(int(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,8 +33,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     return user
 
 
-def require_roles(*roles: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
-    def _role_enforcer(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+def require_roles(*roles: str) -> Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]:
+    async def _role_enforcer(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
         if roles and user.get("role") not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -42,3 +43,12 @@ def require_roles(*roles: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
         return user
 
     return _role_enforcer
+
+
+def get_latency_budget(
+    x_latency_budget_ms: Optional[int] = Header(default=None, alias="X-Latency-Budget-Ms"),
+) -> float:
+    """Seconds an AI-backed endpoint may wait on Gemini before degrading."""
+    budget_ms = AI_LATENCY_BUDGET_MS if x_latency_budget_ms is None else x_latency_budget_ms
+    budget_ms = max(0, min(int(budget_ms), AI_LATENCY_BUDGET_MAX_MS))
+    return budget_ms / 1000.0
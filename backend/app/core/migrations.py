@@ -0,0 +1,365 @@
+"""Versioned SQLite schema migrations keyed on ``PRAGMA user_version``.
+
+Each step in ``MIGRATIONS`` runs once, in order, and bumps ``user_version``
+in the same transaction. When the database is already current ``migrate``
+is a single pragma read, so it is cheap to call on startup; deployments can
+run it ahead of time with::
+
+    python -m app.core.migrations          # apply pending steps
+    python -m app.core.migrations --check  # exit 1 if any are pending
+
+Steps 1-5 reproduce the schema that used to be created on every boot. A
+database from before versioning (``user_version`` 0) can be in any of its
+historical states, so those steps are idempotent. New steps only ever see
+the schema left by the previous one and can use plain DDL.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from app.core.config import DB_PATH
+from app.core.db import get_connection
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Cursor], None]
+
+
+def _columns(cur: sqlite3.Cursor, table: str) -> dict:
+    cur.execute(f"PRAGMA table_info({table})")
+    return {row[1]: (row[2] or "").upper() for row in cur.fetchall()}
+
+
+def _add_column(cur: sqlite3.Cursor, table: str, column: str, definition: str) -> None:
+    if column not in _columns(cur, table):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _core_tables(cur: sqlite3.Cursor) -> None:
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        email TEXT UNIQUE,
+        password_hash TEXT,
+        role TEXT,
+        created_at TEXT,
+        is_banned INTEGER DEFAULT 0,
+        banned_reason TEXT DEFAULT '',
+        banned_at TEXT
+    )""")
+    _add_column(cur, "users", "is_banned", "INTEGER DEFAULT 0")
+    _add_column(cur, "users", "banned_reason", "TEXT DEFAULT ''")
+    _add_column(cur, "users", "banned_at", "TEXT")
+    _add_column(cur, "users", "active_profile_draft_id", "INTEGER")
+    _add_column(cur, "users", "active_uploaded_cv_id", "INTEGER")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        company_name TEXT DEFAULT '',
+        jd_text TEXT DEFAULT '',
+        hr_email TEXT DEFAULT '',
+        created_at TEXT,
+        status TEXT DEFAULT 'pending',
+        admin_approved_by INTEGER,
+        published INTEGER DEFAULT 0,
+        coverage_threshold REAL DEFAULT 0.6,
+        employer_id INTEGER,
+        rejection_reason TEXT DEFAULT '',
+        reviewed_at TEXT,
+        jd_file_path TEXT,
+        jd_file_name TEXT DEFAULT '',
+        jd_minhash BLOB
+    )""")
+    _add_column(cur, "jobs", "rejection_reason", "TEXT DEFAULT ''")
+    _add_column(cur, "jobs", "reviewed_at", "TEXT")
+    _add_column(cur, "jobs", "jd_file_path", "TEXT")
+    _add_column(cur, "jobs", "jd_file_name", "TEXT DEFAULT ''")
+    _add_column(cur, "jobs", "jd_minhash", "BLOB")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS processed (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        email TEXT,
+        uploaded_filename TEXT,
+        job_id INTEGER,
+        jd_summary TEXT,
+        coverage REAL,
+        similarity REAL,
+        missing TEXT,
+        passed INTEGER,
+        hr_email TEXT,
+        sent_email INTEGER DEFAULT 0,
+        predicted_role TEXT,
+        company_name TEXT,
+        job_title TEXT,
+        hr_name TEXT,
+        interview_mode TEXT,
+        schedule_link TEXT,
+        created_at TEXT,
+        invite_sent_at TEXT,
+        invite_subject TEXT DEFAULT '',
+        invite_message TEXT DEFAULT '',
+        cv_text TEXT DEFAULT '',
+        uploaded_file_path TEXT DEFAULT '',
+        cv_minhash BLOB
+    )""")
+    _add_column(cur, "processed", "invite_sent_at", "TEXT")
+    _add_column(cur, "processed", "invite_subject", "TEXT DEFAULT ''")
+    _add_column(cur, "processed", "invite_message", "TEXT DEFAULT ''")
+    _add_column(cur, "processed", "cv_text", "TEXT DEFAULT ''")
+    _add_column(cur, "processed", "uploaded_file_path", "TEXT DEFAULT ''")
+    _add_column(cur, "processed", "cv_minhash", "BLOB")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS profile_drafts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        field TEXT DEFAULT '',
+        position TEXT DEFAULT '',
+        style TEXT DEFAULT '',
+        language TEXT DEFAULT '',
+        template_id TEXT DEFAULT '',
+        schema_version TEXT DEFAULT '',
+        template_version TEXT DEFAULT '',
+        data_json TEXT,
+        blocks_json TEXT,
+        created_at TEXT,
+        updated_at TEXT
+    )""")
+    _add_column(cur, "profile_drafts", "language", "TEXT DEFAULT ''")
+    _add_column(cur, "profile_drafts", "blocks_json", "TEXT")
+    _add_column(cur, "profile_drafts", "draft_title", "TEXT DEFAULT ''")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS uploaded_cvs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT DEFAULT '',
+        mime TEXT DEFAULT '',
+        data_json TEXT,
+        created_at TEXT,
+        updated_at TEXT
+    )""")
+
+
+_MATCH_HISTORY_DDL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        job_id INTEGER NOT NULL,
+        cv_hash TEXT NOT NULL,
+        score REAL,
+        coverage REAL,
+        similarity REAL,
+        analysis_json TEXT,
+        created_at INTEGER NOT NULL DEFAULT 0,
+        cv_source TEXT DEFAULT '',
+        cv_label TEXT DEFAULT '',
+        job_hash TEXT DEFAULT '',
+        UNIQUE (user_id, job_id, cv_hash)
+    )"""
+
+
+def _profile_match_history(cur: sqlite3.Cursor) -> None:
+    """One row per (user_id, job_id, cv_hash) with epoch-second ``created_at``.
+
+    An older append-only table is rebuilt: the newest row of each key
+    survives and ISO timestamps are converted.
+    """
+    cur.execute(_MATCH_HISTORY_DDL.format(name="profile_match_history"))
+    _add_column(cur, "profile_match_history", "cv_source", "TEXT DEFAULT ''")
+    _add_column(cur, "profile_match_history", "cv_label", "TEXT DEFAULT ''")
+    _add_column(cur, "profile_match_history", "job_hash", "TEXT DEFAULT ''")
+    if _columns(cur, "profile_match_history").get("created_at") != "INTEGER":
+        cur.execute("ALTER TABLE profile_match_history RENAME TO profile_match_history_old")
+        cur.execute(_MATCH_HISTORY_DDL.format(name="profile_match_history"))
+        cur.execute("""
+        INSERT INTO profile_match_history
+        (user_id, job_id, cv_hash, score, coverage, similarity, analysis_json, created_at,
+         cv_source, cv_label, job_hash)
+        SELECT user_id, job_id, cv_hash, score, coverage, similarity, analysis_json,
+               COALESCE(CAST(strftime('%s', created_at) AS INTEGER), 0),
+               COALESCE(cv_source, ''), COALESCE(cv_label, ''), COALESCE(job_hash, '')
+        FROM profile_match_history_old
+        WHERE id IN (
+            SELECT MAX(id) FROM profile_match_history_old GROUP BY user_id, job_id, cv_hash
+        )
+        ORDER BY id
+        """)
+        cur.execute("DROP TABLE profile_match_history_old")
+    # Superseded by the unique key and idx_match_history_recent.
+    cur.execute("DROP INDEX IF EXISTS idx_match_history_user")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_match_history_recent "
+        "ON profile_match_history(user_id, created_at)"
+    )
+
+
+def _ranking_snapshots(cur: sqlite3.Cursor) -> None:
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS profile_match_snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        cv_hash TEXT NOT NULL,
+        job_set_version INTEGER NOT NULL,
+        candidates_hash TEXT NOT NULL,
+        complete INTEGER DEFAULT 1,
+        ranking_json TEXT NOT NULL,
+        created_at TEXT
+    )""")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_match_snapshots_user "
+        "ON profile_match_snapshots(user_id, cv_hash)"
+    )
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS app_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )""")
+
+
+def _profile_match_cv_facts(cur: sqlite3.Cursor) -> None:
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS profile_match_cv_facts (
+        cv_hash TEXT PRIMARY KEY,
+        facts_json TEXT NOT NULL,
+        created_at INTEGER NOT NULL DEFAULT 0
+    )""")
+
+
+def _candidate_search(cur: sqlite3.Cursor) -> None:
+    _add_column(cur, "users", "open_to_matching", "INTEGER DEFAULT 0")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS cv_embeddings (
+        user_id INTEGER PRIMARY KEY,
+        cv_hash TEXT NOT NULL,
+        model TEXT NOT NULL,
+        embedding BLOB,
+        updated_at INTEGER NOT NULL DEFAULT 0
+    )""")
+
+
+def _hot_path_indexes(cur: sqlite3.Cursor) -> None:
+    # Applications by job (employer applicant list) and by email (student
+    # history, applied-job filter); created_at serves the history order.
+    cur.execute("CREATE INDEX idx_processed_job ON processed(job_id)")
+    cur.execute("CREATE INDEX idx_processed_email ON processed(email, created_at)")
+    cur.execute("CREATE INDEX idx_jobs_published ON jobs(published)")
+    cur.execute("CREATE INDEX idx_jobs_employer ON jobs(employer_id)")
+    # Partial indexes keep the admin queues small and pre-sorted: the review
+    # queue in id order, the review history in the order it is listed.
+    cur.execute("CREATE INDEX idx_jobs_pending ON jobs(status) WHERE status = 'pending'")
+    cur.execute(
+        "CREATE INDEX idx_jobs_review_history "
+        "ON jobs(COALESCE(reviewed_at, created_at)) "
+        "WHERE status IN ('approved', 'rejected')"
+    )
+    # Logins look users up case-insensitively, which the UNIQUE(email)
+    # index cannot serve. Not unique itself: older rows may differ by case.
+    cur.execute("CREATE INDEX idx_users_email_lower ON users(lower(email))")
+    cur.execute("CREATE INDEX idx_profile_drafts_user ON profile_drafts(user_id, updated_at)")
+
+
+def _drop_match_history_lookup(cur: sqlite3.Cursor) -> None:
+    # Step 2 used to create it; the UNIQUE (user_id, job_id, cv_hash) key
+    # already serves every lookup, so it only slowed down each upsert.
+    cur.execute("DROP INDEX IF EXISTS idx_match_history_lookup")
+
+
+def _cv_index_changes(cur: sqlite3.Cursor) -> None:
+    # One row per cv_index bump naming the student it concerned, so a worker
+    # whose candidate index is a few versions behind patches those rows
+    # instead of reloading every embedding.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS cv_index_changes (
+        version INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL
+    )""")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "core tables", _core_tables),
+    Migration(2, "deduplicated profile match history", _profile_match_history),
+    Migration(3, "ranking snapshots and counters", _ranking_snapshots),
+    Migration(4, "profile match CV facts", _profile_match_cv_facts),
+    Migration(5, "candidate search", _candidate_search),
+    Migration(6, "hot path indexes", _hot_path_indexes),
+    Migration(7, "drop redundant match history index", _drop_match_history_lookup),
+    Migration(8, "candidate index change log", _cv_index_changes),
+]
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def pending_migrations(conn: sqlite3.Connection) -> List[Migration]:
+    version = schema_version(conn)
+    return [step for step in MIGRATIONS if step.version > version]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations; returns the resulting schema version."""
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return schema_version(conn)
+    if conn.in_transaction:
+        conn.commit()
+    # Take the write lock first so concurrent workers migrate one at a time;
+    # whoever waits re-reads the version and finds nothing left to do.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cur = conn.cursor()
+        for step in pending_migrations(conn):
+            step.apply(cur)
+            cur.execute(f"PRAGMA user_version = {int(step.version)}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return schema_version(conn)
+
+
+def ensure_current(conn: sqlite3.Connection) -> None:
+    pending = pending_migrations(conn)
+    if pending:
+        raise RuntimeError(
+            f"Database schema is at version {schema_version(conn)}, expected "
+            f"{SCHEMA_VERSION}. Run `python -m app.core.migrations` first."
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.core.migrations",
+        description="Apply pending SQLite schema migrations.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only report pending migrations; exit 1 if there are any",
+    )
+    args = parser.parse_args(argv)
+    conn = get_connection()
+    before = schema_version(conn)
+    if args.check:
+        pending = pending_migrations(conn)
+        for step in pending:
+            print(f"pending: {step.version} {step.name}")
+        print(f"{DB_PATH}: schema version {before} (latest {SCHEMA_VERSION})")
+        return 1 if pending else 0
+    after = migrate(conn)
+    print(f"{DB_PATH}: schema version {before} -> {after}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Async equivalents of the blocking data-access functions.
+
+Every public function of the wrapped DAO modules is exposed under the same
+name as a coroutine that runs the original on the dedicated DB executor
+(``app.core.db.run_in_db``), e.g. ``await async_dao.jobs.get_job_by_id(1)``.
+From ``profile_service`` only the SQL functions are wrapped; its rendering
+and generation helpers are CPU work and do not belong on the small DB pool.
+Use these from ``async def`` routes; sync code keeps calling the modules
+directly.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+from types import ModuleType, SimpleNamespace
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from app.core.db import run_in_db
+from app.dao import jobs_dao, processed_dao, users_dao
+from app.services import profile_match_service, profile_service
+
+
+def _to_async(fn: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run_in_db(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def _wrap_module(module: ModuleType, names: Optional[Iterable[str]] = None) -> SimpleNamespace:
+    if names is not None:
+        return SimpleNamespace(**{name: _to_async(getattr(module, name)) for name in names})
+    return SimpleNamespace(
+        **{
+            name: _to_async(fn)
+            for name, fn in inspect.getmembers(module, inspect.isfunction)
+            if fn.__module__ == module.__name__ and not name.startswith("_")
+        }
+    )
+
+
+jobs = _wrap_module(jobs_dao)
+processed = _wrap_module(processed_dao)
+users = _wrap_module(users_dao)
+profiles = _wrap_module(
+    profile_service,
+    (
+        "insert_draft",
+        "get_draft",
+        "list_drafts",
+        "delete_draft",
+        "update_draft",
+        "set_active_draft",
+        "clear_active_draft",
+        "get_active_draft",
+        "save_uploaded_cv",
+        "get_uploaded_cv",
+        "set_active_uploaded_cv",
+        "clear_active_uploaded_cv",
+        "get_active_uploaded_cv",
+    ),
+)
+profile_matches = _wrap_module(profile_match_service)
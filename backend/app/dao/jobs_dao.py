@@ -3,10 +3,33 @@ from app.core.db import get_connection
 from datetime import datetime, timezone
 
 
+JOB_SET_VERSION = "job_set_version"
+
+
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+def _bump_job_set_version(cur) -> None:
+    # Called in the same transaction as any write that can change which jobs
+    # are published or what they say; cached rankings key on this counter.
+    cur.execute(
+        """
+        INSERT INTO app_counters (name, value) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1
+        """,
+        (JOB_SET_VERSION,),
+    )
+
+
+def get_job_set_version() -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT value FROM app_counters WHERE name = ?", (JOB_SET_VERSION,))
+    row = cur.fetchone()
+    return int(row["value"]) if row else 0
+
+
 def create_job(data: Dict[str, Any], employer_id: Optional[int]) -> int:
     conn = get_connection()
     cur = conn.cursor()
@@ -23,9 +46,10 @@ def create_job(data: Dict[str, Any], employer_id: Optional[int]) -> int:
             coverage_threshold,
             employer_id,
             jd_file_path,
-            jd_file_name
+            jd_file_name,
+            jd_minhash
         )
-        VALUES (?, ?, ?, ?, ?, 'pending', 0, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, 'pending', 0, ?, ?, ?, ?, ?)
         """,
         (
             data.get("title", ""),
@@ -37,6 +61,7 @@ def create_job(data: Dict[str, Any], employer_id: Optional[int]) -> int:
             employer_id,
             data.get("jd_file_path"),
             data.get("jd_file_name", ""),
+            data.get("jd_minhash"),
         ),
     )
     conn.commit()
@@ -51,6 +76,17 @@ def get_job_by_id(job_id: int) -> Optional[Dict[str, Any]]:
     return dict(row) if row else None
 
 
+def get_jobs_by_ids(job_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    ids = sorted({int(job_id) for job_id in job_ids})
+    if not ids:
+        return {}
+    conn = get_connection()
+    cur = conn.cursor()
+    placeholders = ",".join("?" for _ in ids)
+    cur.execute(f"SELECT * FROM jobs WHERE id IN ({placeholders})", ids)
+    return {int(row["id"]): dict(row) for row in cur.fetchall()}
+
+
 def get_pending_jobs() -> List[Dict[str, Any]]:
     conn = get_connection()
     cur = conn.cursor()
@@ -73,8 +109,11 @@ def update_job_status(
         """,
         (status, published, admin_id, rejection_reason, reviewed_at, int(job_id)),
     )
+    updated = cur.rowcount > 0
+    if updated:
+        _bump_job_set_version(cur)
     conn.commit()
-    return cur.rowcount > 0
+    return updated
 
 
 def update_job(job_id: int, updates: Dict[str, Any]) -> bool:
@@ -92,16 +131,22 @@ def update_job(job_id: int, updates: Dict[str, Any]) -> bool:
         f"UPDATE jobs SET {', '.join(fields)} WHERE id = ?",
         params,
     )
+    updated = cur.rowcount > 0
+    if updated:
+        _bump_job_set_version(cur)
     conn.commit()
-    return cur.rowcount > 0
+    return updated
 
 
 def delete_job(job_id: int) -> bool:
     conn = get_connection()
     cur = conn.cursor()
     cur.execute("DELETE FROM jobs WHERE id = ?", (int(job_id),))
+    deleted = cur.rowcount > 0
+    if deleted:
+        _bump_job_set_version(cur)
     conn.commit()
-    return cur.rowcount > 0
+    return deleted
 
 
 def list_jobs(published_only: bool = False, employer_id: Optional[int] = None) -> List[Dict[str, Any]]:
@@ -136,3 +181,17 @@ def list_review_history(limit: int = 100) -> List[Dict[str, Any]]:
         (limit,),
     )
     return [dict(r) for r in cur.fetchall()]
+
+
+def list_job_signatures() -> List[Dict[str, Any]]:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT id, jd_text, jd_minhash FROM jobs")
+    return [dict(r) for r in cur.fetchall()]
+
+
+def set_job_signature(job_id: int, signature: Optional[bytes]) -> None:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("UPDATE jobs SET jd_minhash = ? WHERE id = ?", (signature, int(job_id)))
+    conn.commit()
@@ -8,13 +8,19 @@ def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+def _row_to_dict(row) -> Dict[str, Any]:
+    data = dict(row)
+    data.pop("cv_minhash", None)
+    return data
+
+
 def list_by_job(job_id: int) -> List[Dict[str, Any]]:
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
         "SELECT * FROM processed WHERE job_id = ? ORDER BY id DESC", (int(job_id),)
     )
-    return [dict(r) for r in cur.fetchall()]
+    return [_row_to_dict(r) for r in cur.fetchall()]
 
 
 def get_by_id(applicant_id: int) -> Optional[Dict[str, Any]]:
@@ -22,7 +28,7 @@ def get_by_id(applicant_id: int) -> Optional[Dict[str, Any]]:
     cur = conn.cursor()
     cur.execute("SELECT * FROM processed WHERE id = ?", (int(applicant_id),))
     row = cur.fetchone()
-    return dict(row) if row else None
+    return _row_to_dict(row) if row else None
 
 
 def insert_processed(data: Dict[str, Any]) -> int:
@@ -33,8 +39,8 @@ def insert_processed(data: Dict[str, Any]) -> int:
         INSERT INTO processed
         (name,email,uploaded_filename,job_id,jd_summary,coverage,similarity,missing,passed,hr_email,sent_email,
          predicted_role,company_name,job_title,hr_name,interview_mode,schedule_link,created_at,
-         invite_sent_at,invite_subject,invite_message,cv_text,uploaded_file_path)
-        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,COALESCE(?, datetime('now')),?,?,?,?,?)
+         invite_sent_at,invite_subject,invite_message,cv_text,uploaded_file_path,cv_minhash)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,COALESCE(?, datetime('now')),?,?,?,?,?,?)
         """,
         (
             data.get("name", ""),
@@ -60,6 +66,7 @@ def insert_processed(data: Dict[str, Any]) -> int:
             data.get("invite_message", ""),
             data.get("cv_text", ""),
             data.get("uploaded_file_path", ""),
+            data.get("cv_minhash"),
         ),
     )
     conn.commit()
@@ -105,7 +112,7 @@ def list_by_email(email: str) -> List[Dict[str, Any]]:
         """,
         (email,),
     )
-    return [dict(r) for r in cur.fetchall()]
+    return [_row_to_dict(r) for r in cur.fetchall()]
 
 
 def list_job_ids_by_email(email: str) -> List[int]:
@@ -119,6 +126,21 @@ def list_job_ids_by_email(email: str) -> List[int]:
     return [int(row["job_id"]) for row in rows if row["job_id"] is not None]
 
 
+def list_applicant_user_ids(job_id: int) -> List[int]:
+    """Registered users who have applied to ``job_id`` (matched by email)."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT DISTINCT u.id FROM processed p
+        JOIN users u ON lower(u.email) = lower(p.email)
+        WHERE p.job_id = ?
+        """,
+        (int(job_id),),
+    )
+    return [int(row["id"]) for row in cur.fetchall()]
+
+
 def get_application_for_user(applicant_id: int, email: str) -> Optional[Dict[str, Any]]:
     conn = get_connection()
     cur = conn.cursor()
@@ -136,7 +158,7 @@ def get_application_for_user(applicant_id: int, email: str) -> Optional[Dict[str
         (int(applicant_id), email),
     )
     row = cur.fetchone()
-    return dict(row) if row else None
+    return _row_to_dict(row) if row else None
 
 
 def delete_application_for_user(applicant_id: int, email: str) -> bool:
@@ -148,3 +170,19 @@ def delete_application_for_user(applicant_id: int, email: str) -> bool:
     )
     conn.commit()
     return cur.rowcount > 0
+
+
+def list_cv_signatures() -> List[Dict[str, Any]]:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT id, cv_text, cv_minhash FROM processed")
+    return [dict(r) for r in cur.fetchall()]
+
+
+def set_cv_signature(applicant_id: int, signature: Optional[bytes]) -> None:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE processed SET cv_minhash = ? WHERE id = ?", (signature, int(applicant_id))
+    )
+    conn.commit()
@@ -50,6 +50,45 @@ def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     return dict(row) if row else None
 
 
+def list_student_ids_with_active_cv() -> List[int]:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT id FROM users
+        WHERE role = 'student'
+          AND (active_profile_draft_id IS NOT NULL OR active_uploaded_cv_id IS NOT NULL)
+        ORDER BY id
+        """,
+    )
+    return [int(r["id"]) for r in cur.fetchall()]
+
+
+def set_open_to_matching(user_id: int, enabled: bool) -> None:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE users SET open_to_matching = ? WHERE id = ?",
+        (1 if enabled else 0, int(user_id)),
+    )
+    conn.commit()
+
+
+def list_open_student_ids() -> List[int]:
+    """Opted-in, non-banned students that have an active CV."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT id FROM users
+        WHERE role = 'student' AND open_to_matching = 1 AND COALESCE(is_banned, 0) = 0
+          AND (active_profile_draft_id IS NOT NULL OR active_uploaded_cv_id IS NOT NULL)
+        ORDER BY id
+        """,
+    )
+    return [int(r["id"]) for r in cur.fetchall()]
+
+
 def list_users() -> List[Dict[str, Any]]:
     conn = get_connection()
     cur = conn.cursor()
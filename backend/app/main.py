@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.core.cors import add_cors
 from app.api.v1.routes_health import router as health_router
@@ -9,11 +11,28 @@ from app.api.v1.routes_email import router as email_router
 from app.api.v1.routes_interview import router as interview_router
 from app.api.v1.routes_profiles import router as profiles_router
 
-from app.core.db import get_connection, migrate
-_conn = get_connection()
-migrate(_conn)
+from app.core.config import DB_MIGRATE_ON_STARTUP
+from app.core.db import close_connections, get_connection, shutdown_db_executor
+from app.core.migrations import ensure_current, migrate
+from app.services import precompute_service, skill_graph_service
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    conn = get_connection()
+    if DB_MIGRATE_ON_STARTUP:
+        migrate(conn)  # a single PRAGMA read when the schema is current
+    else:
+        ensure_current(conn)
+    yield
+    # Stop every thread that uses a pooled connection before closing them.
+    precompute_service.stop()
+    skill_graph_service.flush()
+    shutdown_db_executor()
+    close_connections()
+
 
-app = FastAPI(title="ATI Backend API", version="1.0.0")
+app = FastAPI(title="ATI Backend API", version="1.0.0", lifespan=lifespan)
 add_cors(app)
 
 app.include_router(health_router, prefix="/api/v1")
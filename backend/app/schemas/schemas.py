@@ -88,6 +88,25 @@ class CVProcessResult(BaseModel):
     predicted_role: str
     quality_warnings: List[CVWarning]
     course_suggestions: List[CourseSuggestion]
+    partial_matches: Dict[str, List[str]] = {}
+    analysis_id: Optional[str] = None
+    enrichment_status: Optional[str] = None
+    degraded: bool = False
+
+
+class CVBatchRequest(BaseModel):
+    cv_text: Optional[str] = None  # defaults to the user's active CV
+    job_ids: List[int]
+
+class CVBatchItem(BaseModel):
+    job_id: int
+    title: Optional[str] = None
+    result: Optional[CVProcessResult] = None
+    error: Optional[str] = None
+
+class CVBatchResult(BaseModel):
+    cv_source: str
+    items: List[CVBatchItem]
 
 
 class JobDescriptionRequest(BaseModel):
@@ -103,6 +122,7 @@ class JobDescriptionRequest(BaseModel):
 class JobDescriptionResponse(BaseModel):
     jd_text: str
     source: str = "gemini"
+    degraded: bool = False
 
 
 class ProfileTemplateOut(BaseModel):
@@ -163,6 +183,10 @@ class ProfileUploadedActivateRequest(BaseModel):
     data_url: str
 
 
+class OpenToMatchingRequest(BaseModel):
+    enabled: bool
+
+
 class UploadedCvSummary(BaseModel):
     id: int
     name: str
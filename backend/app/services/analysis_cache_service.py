@@ -0,0 +1,46 @@
+"""Shared cache of CV analysis results.
+
+Entries are keyed by (CV text hash, job content hash, scoring model version,
+Gemini prompt version), so editing a job's ``jd_text`` or threshold, swapping
+the embedding model or changing the prompt all miss naturally.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL_SECONDS
+from app.schemas.schemas import CVProcessResult
+from app.services.embedding_service import model_version
+from app.services.gemini_service import cv_analysis_version
+
+_CACHE: TTLCache[CVProcessResult] = TTLCache(
+    ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL_SECONDS
+)
+
+
+def cv_text_hash(cv_text: str) -> str:
+    return hashlib.sha256((cv_text or "").strip().encode("utf-8")).hexdigest()
+
+
+def job_content_hash(job: Optional[Dict[str, Any]]) -> str:
+    if not job:
+        return ""
+    jd_text = (job.get("jd_text") or "").strip()
+    threshold = float(job.get("coverage_threshold", 0.6) or 0.0)
+    return hashlib.sha256(f"{threshold:.4f}\x00{jd_text}".encode("utf-8")).hexdigest()
+
+
+def analysis_key(cv_hash: str, job: Optional[Dict[str, Any]]) -> Tuple[str, str, str, str]:
+    return (cv_hash, job_content_hash(job), model_version(), cv_analysis_version())
+
+
+def get(key: Tuple[str, str, str, str]) -> Optional[CVProcessResult]:
+    return _CACHE.get(key)
+
+
+def put(key: Tuple[str, str, str, str], result: CVProcessResult) -> None:
+    # Request-specific fields are never cached.
+    _CACHE.put(key, result.model_copy(update={"analysis_id": None, "enrichment_status": None}))
@@ -0,0 +1,103 @@
+"""In-memory registry of async CV analyses.
+
+``start_analysis`` returns the deterministic result immediately and hands the
+Gemini enrichment to the shared Gemini pool; callers poll (or long-poll) by
+analysis ID for the enriched version.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from app.core.config import ANALYSIS_JOB_TTL_SECONDS
+from app.schemas.schemas import CVProcessResult
+from app.services import analysis_cache_service, gemini_service
+from app.services.cv_matching_service import build_deterministic_analysis, enrich_analysis
+
+_JOBS: Dict[str, Dict[str, Any]] = {}
+_LOCK = threading.Lock()
+
+
+def _purge_expired(now: float) -> None:
+    expired = [
+        key
+        for key, record in _JOBS.items()
+        if now - record["created_at"] > ANALYSIS_JOB_TTL_SECONDS
+    ]
+    for key in expired:
+        _JOBS.pop(key, None)
+
+
+def start_analysis(
+    cv_text: str, job: Optional[Dict[str, object]], owner_id: int
+) -> CVProcessResult:
+    analysis_id = uuid4().hex
+    future: Optional[Future] = None
+    cache_key = analysis_cache_service.analysis_key(
+        analysis_cache_service.cv_text_hash(cv_text), job  # type: ignore[arg-type]
+    )
+    cached = analysis_cache_service.get(cache_key)
+    if cached is not None:
+        base = cached
+    else:
+        base = build_deterministic_analysis(cv_text, job)
+        if gemini_service.gemini_available():
+            future = gemini_service.submit(enrich_analysis, base, cv_text, job)
+        else:
+            analysis_cache_service.put(cache_key, base)
+    now = time.time()
+    record = {
+        "owner_id": owner_id,
+        "created_at": now,
+        "base": base,
+        "future": future,
+        "cached": cached is not None,
+    }
+    with _LOCK:
+        _purge_expired(now)
+        _JOBS[analysis_id] = record
+    return snapshot(analysis_id, record)
+
+
+def get_record(analysis_id: str, owner_id: int) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        record = _JOBS.get(analysis_id)
+    if not record or record["owner_id"] != owner_id:
+        return None
+    return record
+
+
+def snapshot(analysis_id: str, record: Dict[str, Any]) -> CVProcessResult:
+    base: CVProcessResult = record["base"]
+    future: Optional[Future] = record["future"]
+    if record.get("cached"):
+        result, status = base, "completed"
+    elif future is None:
+        result, status = base, "skipped"
+    elif not future.done():
+        result, status = base, "pending"
+    elif future.exception() is not None:
+        result, status = base, "failed"
+    else:
+        result = future.result()
+        status = result.enrichment_status or "completed"
+    return result.model_copy(update={"analysis_id": analysis_id, "enrichment_status": status})
+
+
+async def wait_for_analysis(
+    analysis_id: str, owner_id: int, timeout: float
+) -> Optional[CVProcessResult]:
+    """Long-poll: wait up to ``timeout`` seconds for enrichment to finish."""
+    record = get_record(analysis_id, owner_id)
+    if record is None:
+        return None
+    future: Optional[Future] = record["future"]
+    if future is not None and not future.done() and timeout > 0:
+        # asyncio.wait does not cancel the underlying future on timeout
+        await asyncio.wait({asyncio.wrap_future(future)}, timeout=timeout)
+    return snapshot(analysis_id, record)
@@ -0,0 +1,307 @@
+"""Reverse matching: rank opted-in students' active CVs against one job.
+
+The text embedding of every opted-in student's active CV is stored in
+``cv_embeddings`` and refreshed when the CV or the opt-in changes. All of
+them are loaded into one normalised float32 matrix kept in memory, so ranking
+a job is one matrix-vector product plus ``argpartition`` for the top k. Every
+change bumps the ``cv_index`` counter and logs the student in
+``cv_index_changes``; a worker whose matrix is behind reloads only those
+students' rows, and everything only on a model switch or a large or missing
+stretch of the log. The full (deterministic) analysis runs only for the page
+being returned. Without an embedding model the ranking falls back to lexical
+similarity over the candidates' CV texts, read in one query.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.db import get_connection
+from app.dao import users_dao
+from app.services import profile_service
+from app.services.cv_matching_service import (
+    get_cv_features,
+    get_jd_text_embedding,
+    score_cv_features,
+)
+from app.services.analysis_cache_service import cv_text_hash
+from app.services.embedding_service import lexical_similarity, model_version
+
+CV_INDEX_VERSION = "cv_index"
+LEXICAL_MODEL = "lexical"
+# Change-log rows kept, and the most changed students patched in place; a
+# worker further behind than either reloads the whole index.
+CV_INDEX_LOG_KEEP = 10000
+CV_INDEX_DELTA_MAX = 500
+
+_INDEX: Dict[str, Any] = {}
+_LOCK = threading.Lock()
+
+Candidate = Tuple[int, float]  # (user_id, score)
+
+
+def _bump_index_version(cur, user_id: int) -> None:
+    cur.execute(
+        """
+        INSERT INTO app_counters (name, value) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1
+        """,
+        (CV_INDEX_VERSION,),
+    )
+    cur.execute("SELECT value FROM app_counters WHERE name = ?", (CV_INDEX_VERSION,))
+    version = int(cur.fetchone()["value"])
+    cur.execute(
+        "INSERT INTO cv_index_changes (version, user_id) VALUES (?, ?)", (version, int(user_id))
+    )
+    cur.execute(
+        "DELETE FROM cv_index_changes WHERE version <= ?", (version - CV_INDEX_LOG_KEEP,)
+    )
+
+
+def _index_version() -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT value FROM app_counters WHERE name = ?", (CV_INDEX_VERSION,))
+    row = cur.fetchone()
+    return int(row["value"]) if row else 0
+
+
+def _is_open_student(user: Optional[Dict[str, Any]]) -> bool:
+    return bool(
+        user
+        and user.get("role") == "student"
+        and user.get("open_to_matching")
+        and not user.get("is_banned")
+    )
+
+
+def refresh_candidate(user_id: int) -> None:
+    """Bring the user's stored CV embedding in line with their active CV and opt-in."""
+    user = users_dao.get_user_by_id(user_id)
+    active_cv = profile_service.get_active_cv(user_id) if _is_open_student(user) else None
+    conn = get_connection()
+    cur = conn.cursor()
+    if not active_cv:
+        cur.execute("DELETE FROM cv_embeddings WHERE user_id = ?", (int(user_id),))
+        if cur.rowcount:
+            _bump_index_version(cur, user_id)
+        conn.commit()
+        return
+    features = get_cv_features(active_cv["text"])
+    model = model_version()
+    cur.execute("SELECT cv_hash, model FROM cv_embeddings WHERE user_id = ?", (int(user_id),))
+    row = cur.fetchone()
+    if row and row["cv_hash"] == features.cv_hash and row["model"] == model:
+        return
+    embedding = features.embeddings()[0] if model != LEXICAL_MODEL else None
+    cur.execute(
+        """
+        INSERT INTO cv_embeddings (user_id, cv_hash, model, embedding, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            cv_hash = excluded.cv_hash,
+            model = excluded.model,
+            embedding = excluded.embedding,
+            updated_at = excluded.updated_at
+        """,
+        (
+            int(user_id),
+            features.cv_hash,
+            model,
+            None if embedding is None else np.asarray(embedding, dtype=np.float32).tobytes(),
+            int(time.time()),
+        ),
+    )
+    _bump_index_version(cur, user_id)
+    conn.commit()
+
+
+def set_open_to_matching(user_id: int, enabled: bool) -> None:
+    users_dao.set_open_to_matching(user_id, enabled)
+    refresh_candidate(user_id)
+    # Membership changed even if the stored embedding did not.
+    conn = get_connection()
+    cur = conn.cursor()
+    _bump_index_version(cur, user_id)
+    conn.commit()
+
+
+def _load_index(model: str, user_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Embeddings of every candidate for ``model``, or only of ``user_ids``."""
+    conn = get_connection()
+    cur = conn.cursor()
+    only = ""
+    params: List[Any] = [model]
+    if user_ids is not None:
+        only = f"AND e.user_id IN ({','.join('?' * len(user_ids))})"
+        params.extend(user_ids)
+    cur.execute(
+        f"""
+        SELECT e.user_id, e.embedding FROM cv_embeddings e
+        JOIN users u ON u.id = e.user_id
+        WHERE u.role = 'student' AND u.open_to_matching = 1 AND COALESCE(u.is_banned, 0) = 0
+          AND e.model = ? AND e.embedding IS NOT NULL {only}
+        ORDER BY e.user_id
+        """,
+        params,
+    )
+    rows = cur.fetchall()
+    return {
+        "user_ids": np.asarray([int(row["user_id"]) for row in rows], dtype=np.int64),
+        "matrix": (
+            np.vstack([np.frombuffer(row["embedding"], dtype=np.float32) for row in rows])
+            if rows
+            else np.zeros((0, 0), dtype=np.float32)
+        ),
+    }
+
+
+def _changed_user_ids(since: int, until: int) -> Optional[List[int]]:
+    """Students changed in versions ``since + 1 .. until``, or None when the
+    log no longer covers that range or it is too long to patch."""
+    if until - since > CV_INDEX_LOG_KEEP:
+        return None
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT user_id FROM cv_index_changes WHERE version > ? AND version <= ?",
+        (since, until),
+    )
+    rows = cur.fetchall()
+    if len(rows) != until - since:
+        return None
+    changed = sorted({int(row["user_id"]) for row in rows})
+    return changed if len(changed) <= CV_INDEX_DELTA_MAX else None
+
+
+def _patch_index(
+    index: Dict[str, Any], changed: List[int], fresh: Dict[str, Any]
+) -> Dict[str, Any]:
+    """``index`` with the rows of ``changed`` replaced by ``fresh`` (new arrays;
+    the old ones may still be in use by a reader)."""
+    keep = ~np.isin(index["user_ids"], changed)
+    user_ids = np.concatenate([index["user_ids"][keep], fresh["user_ids"]])
+    parts = [m for m in (index["matrix"][keep], fresh["matrix"]) if m.shape[0]]
+    matrix = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+    order = np.argsort(user_ids, kind="stable")
+    return {"user_ids": user_ids[order], "matrix": matrix[order]}
+
+
+def _get_index(model: str) -> Tuple[Dict[str, Any], bool]:
+    """The in-memory index for ``model`` and whether it was fully rebuilt."""
+    with _LOCK:
+        key = (_index_version(), model)
+        current = _INDEX.get("key")
+        if current == key:
+            return dict(_INDEX), False
+        changed = None
+        if current is not None and current[1] == model and current[0] < key[0]:
+            changed = _changed_user_ids(current[0], key[0])
+        if changed is None:
+            index, rebuilt = _load_index(model), True
+        else:
+            index, rebuilt = _patch_index(_INDEX, changed, _load_index(model, changed)), False
+        index["key"] = key
+        _INDEX.clear()
+        _INDEX.update(index)
+        return dict(index), rebuilt
+
+
+def stale_candidate_ids() -> List[int]:
+    """Opted-in students whose stored embedding is missing, was computed by
+    another model, or no longer matches their active CV."""
+    model = model_version()
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT user_id, cv_hash, model FROM cv_embeddings")
+    stored = {int(row["user_id"]): (row["cv_hash"], row["model"]) for row in cur.fetchall()}
+    active = dict(profile_service.list_open_student_cvs())
+    todo: List[int] = []
+    for user_id in users_dao.list_open_student_ids():
+        active_cv = active.get(user_id)
+        if not active_cv:
+            # Nothing to embed; only a leftover row needs removing.
+            if user_id in stored:
+                todo.append(user_id)
+            continue
+        if stored.get(user_id) != (cv_text_hash(active_cv["text"]), model):
+            todo.append(user_id)
+    return todo
+
+
+def backfill_candidates() -> int:
+    """Re-embed every stale opted-in student; returns how many were refreshed."""
+    todo = stale_candidate_ids()
+    for user_id in todo:
+        refresh_candidate(user_id)
+    return len(todo)
+
+
+def _top_k(user_ids: np.ndarray, scores: np.ndarray, k: int) -> List[Candidate]:
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return []
+    part = np.argpartition(-scores, k - 1)[:k]
+    order = part[np.argsort(-scores[part], kind="stable")]
+    return [(int(user_ids[i]), round(float(scores[i]), 4)) for i in order]
+
+
+def top_candidates(
+    job: Dict[str, Any], k: int, exclude_user_ids: Iterable[int] = ()
+) -> Tuple[List[Candidate], int]:
+    """Best ``k`` opted-in students for ``job`` by CV/JD similarity, and the
+    number of students ranked."""
+    excluded = set(exclude_user_ids)
+    model = model_version()
+    if model != LEXICAL_MODEL:
+        index, rebuilt = _get_index(model)
+        if rebuilt:
+            # Embeddings stored before the model was available, or missed
+            # while the precompute queue was off or full, are caught up in
+            # the background; without a worker, here but outside the lock.
+            from app.services import precompute_service
+
+            if not precompute_service.enqueue_candidate_backfill() and backfill_candidates():
+                index, _ = _get_index(model)
+        query = get_jd_text_embedding(job)
+        user_ids, matrix = index["user_ids"], index["matrix"]
+        keep = ~np.isin(user_ids, list(excluded)) if excluded else np.ones(len(user_ids), bool)
+        if query is None or not keep.any():
+            return [], int(keep.sum())
+        scores = matrix[keep] @ np.asarray(query, dtype=np.float32)
+        return _top_k(user_ids[keep], scores, k), int(keep.sum())
+
+    jd_text = (job.get("jd_text") or "").strip()
+    scored: List[Candidate] = [
+        (user_id, round(lexical_similarity(active_cv["text"], jd_text), 4))
+        for user_id, active_cv in profile_service.list_open_student_cvs()
+        if user_id not in excluded
+    ]
+    return heapq.nlargest(k, scored, key=lambda item: item[1]), len(scored)
+
+
+def analyse_candidates(job: Dict[str, Any], ranked: List[Candidate]) -> List[Dict[str, Any]]:
+    """Full deterministic analysis for one page of ``top_candidates``."""
+    items: List[Dict[str, Any]] = []
+    for user_id, score in ranked:
+        user = users_dao.get_user_by_id(user_id)
+        if not _is_open_student(user):
+            continue
+        active_cv = profile_service.get_active_cv(user_id)
+        if not active_cv:
+            continue
+        result = score_cv_features(get_cv_features(active_cv["text"]), job)
+        items.append(
+            {
+                "student": {"id": user["id"], "name": user.get("name"), "email": user.get("email")},
+                "cv_label": active_cv["label"],
+                "score": score,
+                "match": result.dict(),
+            }
+        )
+    return items
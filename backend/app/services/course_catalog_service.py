@@ -0,0 +1,209 @@
+"""Course catalog loaded from ``COURSE_CATALOG_PATH`` (JSONL or CSV).
+
+Courses are indexed by canonical skill name (plus optional aliases). Lookups
+try an exact hash hit, then any word n-gram of the skill, then a fuzzy match
+and finally an embedding nearest neighbour. ``lookup_many`` encodes all of a
+request's remaining misses in one model call, and every resolution (including
+"no match") is remembered until the catalog changes. The file is reloaded
+automatically when its modification time changes; an edit that cannot be
+parsed is logged and the previously loaded catalog stays in use.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import COURSE_CATALOG_PATH
+from app.services.embedding_service import encode_normalized
+
+try:
+    from rapidfuzz import fuzz, process  # type: ignore
+except Exception:
+    fuzz = None
+    process = None
+
+logger = logging.getLogger(__name__)
+
+CourseSuggestion = Dict[str, str]
+
+FUZZY_MIN_SCORE = 88
+EMBEDDING_MIN_SIMILARITY = 0.6
+RESOLVED_MAX_ENTRIES = 10000
+
+_LOCK = threading.Lock()
+_INDEX: Dict[str, List[CourseSuggestion]] = {}
+_KEYS: List[str] = []
+_KEY_EMBEDDINGS: Optional[np.ndarray] = None
+_LOADED_MTIME: Optional[float] = None
+# (canonical skill, semantic) -> matched catalog key or None. Replaced, not
+# cleared, on reload so a lookup racing the reload cannot repopulate it.
+_RESOLVED: Dict[Tuple[str, bool], Optional[str]] = {}
+
+
+def _canonical(skill: str) -> str:
+    return " ".join((skill or "").lower().replace("-", " ").split())
+
+
+def _read_rows(path: Path) -> List[Dict[str, object]]:
+    rows: List[Dict[str, object]] = []
+    with path.open(encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            for row in csv.DictReader(f):
+                aliases = [a for a in (row.get("aliases") or "").split("|") if a.strip()]
+                rows.append({**row, "aliases": aliases})
+        else:
+            for ln in f:
+                ln = ln.strip()
+                if not ln:
+                    continue
+                try:
+                    rows.append(json.loads(ln))
+                except json.JSONDecodeError:
+                    continue
+    return rows
+
+
+def _build(rows: List[Dict[str, object]]) -> Dict[str, List[CourseSuggestion]]:
+    index: Dict[str, List[CourseSuggestion]] = {}
+    aliases_by_key: Dict[str, str] = {}
+    for row in rows:
+        skill = str(row.get("skill") or "").strip()
+        title = str(row.get("title") or "").strip()
+        if not skill or not title:
+            continue
+        course = {
+            "skill": skill,
+            "title": title,
+            "provider": str(row.get("provider") or "").strip(),
+            "url": str(row.get("url") or "").strip(),
+        }
+        key = _canonical(skill)
+        index.setdefault(key, []).append(course)
+        aliases = row.get("aliases") or []
+        if isinstance(aliases, list):
+            for alias in aliases:
+                alias_key = _canonical(str(alias))
+                if alias_key and alias_key != key:
+                    aliases_by_key.setdefault(alias_key, key)
+    for alias_key, key in aliases_by_key.items():
+        # Aliases share the course list of their canonical skill.
+        index.setdefault(alias_key, index[key])
+    return index
+
+
+def reload_catalog() -> int:
+    """Force a reload from disk and return the number of indexed skills.
+
+    A catalog that exists but cannot be parsed leaves the current index in
+    place (it is not retried until the file changes again).
+    """
+    global _INDEX, _KEYS, _KEY_EMBEDDINGS, _LOADED_MTIME, _RESOLVED
+    path = Path(COURSE_CATALOG_PATH)
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        mtime = None
+    index: Dict[str, List[CourseSuggestion]] = {}
+    if mtime is not None:
+        try:
+            index = _build(_read_rows(path))
+        except (OSError, UnicodeDecodeError, csv.Error, ValueError) as exc:
+            logger.warning("Could not load course catalog %s: %s", path, exc)
+            with _LOCK:
+                _LOADED_MTIME = mtime
+                return len(_INDEX)
+    with _LOCK:
+        _INDEX = index
+        _KEYS = list(index.keys())
+        _KEY_EMBEDDINGS = None
+        _LOADED_MTIME = mtime
+        _RESOLVED = {}
+    return len(index)
+
+
+def _ensure_fresh() -> None:
+    try:
+        mtime: Optional[float] = os.stat(COURSE_CATALOG_PATH).st_mtime
+    except OSError:
+        mtime = None
+    if _LOADED_MTIME is None or mtime != _LOADED_MTIME:
+        reload_catalog()
+
+
+def _ngram_lookup(key: str) -> Optional[str]:
+    words = key.split()
+    for size in range(len(words), 0, -1):
+        for start in range(len(words) - size + 1):
+            gram = " ".join(words[start : start + size])
+            if gram in _INDEX:
+                return gram
+    return None
+
+
+def _fuzzy_lookup(key: str) -> Optional[str]:
+    if process is None or not _KEYS:
+        return None
+    match = process.extractOne(key, _KEYS, scorer=fuzz.ratio, score_cutoff=FUZZY_MIN_SCORE)
+    return match[0] if match else None
+
+
+def _embedding_lookup(keys: List[str]) -> List[Optional[str]]:
+    """Nearest catalog key for each of ``keys``, encoded in one batch."""
+    global _KEY_EMBEDDINGS
+    if not _KEYS or not keys:
+        return [None] * len(keys)
+    if _KEY_EMBEDDINGS is None:
+        _KEY_EMBEDDINGS = encode_normalized(_KEYS)
+    queries = encode_normalized(keys)
+    if _KEY_EMBEDDINGS is None or queries is None or not _KEY_EMBEDDINGS.size:
+        return [None] * len(keys)
+    sims = queries @ _KEY_EMBEDDINGS.T
+    best = sims.argmax(axis=1)
+    return [
+        _KEYS[int(b)] if float(sims[i, b]) >= EMBEDDING_MIN_SIMILARITY else None
+        for i, b in enumerate(best)
+    ]
+
+
+def lookup_many(
+    skills: Iterable[str], semantic: bool = True
+) -> List[Tuple[Optional[str], List[CourseSuggestion]]]:
+    """``lookup`` for several skills; semantic misses share one model call."""
+    _ensure_fresh()
+    resolved = _RESOLVED
+    keys = [_canonical(skill) for skill in skills]
+    matches: Dict[str, Optional[str]] = {}
+    todo: List[str] = []
+    for key in dict.fromkeys(k for k in keys if k):
+        if (key, semantic) in resolved:
+            matches[key] = resolved[(key, semantic)]
+            continue
+        matched = key if key in _INDEX else _ngram_lookup(key)
+        if matched is None:
+            matched = _fuzzy_lookup(key)
+        if matched is None and semantic:
+            todo.append(key)
+        else:
+            matches[key] = matched
+    matches.update(zip(todo, _embedding_lookup(todo)))
+    if len(resolved) + len(matches) > RESOLVED_MAX_ENTRIES:
+        resolved.clear()
+    for key, matched in matches.items():
+        resolved[(key, semantic)] = matched
+    return [
+        (matches[key], list(_INDEX.get(matches[key], []))) if key and matches[key] else (None, [])
+        for key in keys
+    ]
+
+
+def lookup(skill: str, semantic: bool = True) -> Tuple[Optional[str], List[CourseSuggestion]]:
+    """Return the matched catalog key and its courses for ``skill``."""
+    return lookup_many([skill], semantic)[0]
@@ -0,0 +1,96 @@
+"""Single-pass CV/JD text analysis shared by skills, quality and role detection.
+
+``analyse_document`` normalises whitespace once and walks the text with one
+combined regex that finds emails, phone numbers and words together. The
+resulting ``CVDocument`` carries everything the downstream heuristics used to
+recompute with their own regex passes.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Tuple
+
+SECTION_KEYWORDS: Tuple[str, ...] = ("experience", "education", "skill")
+
+# Phone-like runs with at least this many characters after an optional "+"
+# are stripped before skill extraction; shorter ones still count as a contact
+# number for the quality check.
+SKILL_PHONE_MIN_LENGTH = 9
+
+_PHONE = r"\+?\d[\d\s\-]{7,}"
+# A word stops where a phone number glued to it begins ("Tel0901234567",
+# "SĐT+84901234567"), so the number is still found and stripped.
+_SCAN_RE = re.compile(
+    r"(?P<email>[\w\.-]+@[\w\.-]+\.[a-zA-Z]{2,})"
+    rf"|(?P<phone>{_PHONE})"
+    rf"|(?P<word>\w*?[^\W\d](?={_PHONE})|\w+)"
+)
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class CVDocument:
+    text: str  # whitespace-normalised
+    lowered: str
+    skill_text: str  # text with emails and long phone numbers removed
+    emails: List[str] = field(default_factory=list)
+    phones: List[str] = field(default_factory=list)
+    word_count: int = 0
+    sections: FrozenSet[str] = frozenset()
+
+    @property
+    def has_email(self) -> bool:
+        return bool(self.emails)
+
+    @property
+    def has_phone(self) -> bool:
+        return bool(self.phones)
+
+
+def analyse_document(raw_text: str) -> CVDocument:
+    text = re.sub(r"\s+", " ", (raw_text or "").replace("\r", " ")).strip()
+    lowered = text.lower()
+    emails: List[str] = []
+    phones: List[str] = []
+    kept: List[str] = []
+    sections = set()
+    word_count = 0
+    last = 0
+    glued_end = -1  # end of the previous match if it ended in a word character
+    for match in _SCAN_RE.finditer(text):
+        kind = match.lastgroup
+        value = match.group()
+        # A match that continues the previous one's word ("SĐT" + "0901234567")
+        # shares that word, as a plain \w+ count sees it.
+        if match.start() == glued_end and _WORD_RE.match(value):
+            word_count -= 1
+        glued_end = match.end() if _WORD_RE.match(value[-1]) else -1
+        if kind == "word":
+            word_count += 1
+            if len(sections) < len(SECTION_KEYWORDS):
+                low = lowered[match.start() : match.end()]
+                sections.update(kw for kw in SECTION_KEYWORDS if kw in low)
+            continue
+        word_count += len(_WORD_RE.findall(value))
+        if kind == "email":
+            emails.append(value)
+        else:
+            phones.append(value)
+            if len(value.lstrip("+")) < SKILL_PHONE_MIN_LENGTH:
+                continue
+        kept.append(text[last : match.start()])
+        kept.append(" ")
+        last = match.end()
+    kept.append(text[last:])
+    skill_text = re.sub(r"\s+", " ", "".join(kept)).strip()
+    return CVDocument(
+        text=text,
+        lowered=lowered,
+        skill_text=skill_text,
+        emails=emails,
+        phones=phones,
+        word_count=word_count,
+        sections=frozenset(sections),
+    )
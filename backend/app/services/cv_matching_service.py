@@ -1,63 +1,479 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import (
+    ANALYSIS_CACHE_TTL_SECONDS,
+    FEATURE_CACHE_MAX_ENTRIES,
+    GEMINI_PER_REQUEST_CONCURRENCY,
+)
 from app.schemas.schemas import CVProcessResult
 from app.services.skills_service import extract_skills
-from app.services.embedding_service import coverage_score, semantic_similarity
+from app.services.cv_document_service import CVDocument, analyse_document
+from app.services.embedding_service import (
+    coverage_from_best,
+    coverage_from_embeddings,
+    encode_normalized,
+    lexical_similarity,
+    model_version,
+)
 from app.services.matching_service import predict_cv_category
 from app.services.feedback_service import analyse_cv_quality, suggest_courses
+from app.services import analysis_cache_service, gemini_service
+from app.services.analysis_cache_service import cv_text_hash, job_content_hash
 from app.services.gemini_service import analyze_cv_with_gemini
+from app.services.skill_graph_service import partial_credit_neighbors
 
 
-def build_cv_analysis(cv_text: str, job: Optional[Dict[str, object]] = None) -> CVProcessResult:
-    jd_text = (job.get("jd_text", "") if job else "").strip()  # type: ignore[arg-type]
-    cv_skills = extract_skills(cv_text)
-    jd_skills = extract_skills(jd_text) if jd_text else []
-    coverage, missing, matched = coverage_score(cv_skills, jd_skills)
-    similarity = semantic_similarity(cv_text, jd_text) if jd_text else 0.0
-    coverage = max(0.0, min(1.0, float(coverage)))
-    similarity = max(0.0, min(1.0, float(similarity)))
-    threshold = float(job.get("coverage_threshold", 0.6)) if job else 0.6  # type: ignore[arg-type]
-    passed = bool(coverage >= threshold) if jd_skills else False
-    predicted_role = predict_cv_category(cv_text)
-    quality_warnings = analyse_cv_quality(cv_text, cv_skills)
-    course_suggestions = suggest_courses(missing)
+def _encode_text_and_skills(
+    text: str, skills: List[str]
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    text_embs = encode_normalized([text]) if text else None
+    text_emb = text_embs[0] if text_embs is not None and text_embs.shape[0] else None
+    return text_emb, encode_normalized(skills)
 
-    gemini_result = analyze_cv_with_gemini(
-        cv_text=cv_text,
-        jd_text=jd_text,
-        fallback_cv_skills=cv_skills,
-        fallback_jd_skills=jd_skills,
+
+@dataclass
+class CVFeatures:
+    """Everything about a CV that does not depend on the job it is scored against."""
+
+    cv_hash: str
+    cv_text: str
+    cv_skills: List[str]
+    _doc: Optional[CVDocument] = field(default=None, repr=False)
+    _predicted_role: Optional[str] = field(default=None, repr=False)
+    _quality_warnings: Optional[List[Dict[str, str]]] = field(default=None, repr=False)
+    _embeddings: Optional[Tuple[Optional[np.ndarray], Optional[np.ndarray]]] = field(
+        default=None, repr=False
     )
-    if gemini_result:
-        cv_skills = list(gemini_result.get("cv_skills", cv_skills) or cv_skills)
-        jd_skills = list(gemini_result.get("jd_skills", jd_skills) or jd_skills)
-        matched = list(gemini_result.get("matched", matched) or matched)
-        missing = list(gemini_result.get("missing", missing) or missing)
-        coverage = gemini_result.get("coverage", coverage) or coverage
-        similarity = gemini_result.get("similarity", similarity) or similarity
-        coverage = max(0.0, min(1.0, float(coverage)))
-        similarity = max(0.0, min(1.0, float(similarity)))
-        predicted_role = (
-            gemini_result.get("predicted_role") or predicted_role or "Unknown"
+
+    # Role and quality are not needed to start Gemini (it only takes the
+    # skills), so they are computed on first use, after the submit.
+    @property
+    def predicted_role(self) -> str:
+        if self._predicted_role is None:
+            self._predicted_role = predict_cv_category(self.cv_text, doc=self._doc)
+        return self._predicted_role
+
+    @property
+    def quality_warnings(self) -> List[Dict[str, str]]:
+        if self._quality_warnings is None:
+            self._quality_warnings = analyse_cv_quality(
+                self.cv_text, self.cv_skills, doc=self._doc
+            )
+        return self._quality_warnings
+
+    def embeddings(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """(text embedding, skill embeddings), encoded on first use."""
+        if self._embeddings is None:
+            self._embeddings = _encode_text_and_skills(self.cv_text, self.cv_skills)
+        return self._embeddings
+
+
+@dataclass
+class JDFeatures:
+    job_hash: str
+    jd_text: str
+    jd_skills: List[str]
+    threshold: float
+    _embeddings: Optional[Tuple[Optional[np.ndarray], Optional[np.ndarray]]] = field(
+        default=None, repr=False
+    )
+
+    def embeddings(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        if self._embeddings is None:
+            self._embeddings = _encode_text_and_skills(self.jd_text, self.jd_skills)
+        return self._embeddings
+
+
+_CV_FEATURES: TTLCache[CVFeatures] = TTLCache(FEATURE_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL_SECONDS)
+_JD_FEATURES: TTLCache[JDFeatures] = TTLCache(FEATURE_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL_SECONDS)
+
+
+def _job_threshold(job: Optional[Dict[str, object]]) -> float:
+    return float(job.get("coverage_threshold", 0.6)) if job else 0.6  # type: ignore[arg-type]
+
+
+def _job_jd_text(job: Optional[Dict[str, object]]) -> str:
+    return (job.get("jd_text", "") if job else "").strip()  # type: ignore[union-attr]
+
+
+def get_cv_features(cv_text: str) -> CVFeatures:
+    """CV-side features, built once per CV text and cached by its hash."""
+    cv_hash = cv_text_hash(cv_text)
+    key = (cv_hash, model_version())
+    features = _CV_FEATURES.get(key)
+    if features is None:
+        doc = analyse_document(cv_text)
+        features = CVFeatures(
+            cv_hash=cv_hash,
+            cv_text=cv_text,
+            cv_skills=extract_skills(cv_text, doc=doc),
+            _doc=doc,
         )
-        quality_warnings = list(gemini_result.get("quality_warnings") or quality_warnings)
-        course_suggestions = list(
-            gemini_result.get("course_suggestions") or course_suggestions
+        _CV_FEATURES.put(key, features)
+    return features
+
+
+def get_jd_features(job: Optional[Dict[str, object]]) -> JDFeatures:
+    job_hash = job_content_hash(job)  # type: ignore[arg-type]
+    key = (job_hash, model_version())
+    features = _JD_FEATURES.get(key)
+    if features is None:
+        jd_text = _job_jd_text(job)
+        features = JDFeatures(
+            job_hash=job_hash,
+            jd_text=jd_text,
+            jd_skills=extract_skills(jd_text) if jd_text else [],
+            threshold=_job_threshold(job),
         )
-        if jd_skills:
-            passed = bool(coverage >= threshold)
+        _JD_FEATURES.put(key, features)
+    return features
+
+
+def _prime_jd_embeddings(jds: Sequence[JDFeatures]) -> None:
+    """Encode every not-yet-embedded JD (text and skills) in a single model call."""
+    todo = [jd for jd in jds if jd._embeddings is None and jd.jd_text]
+    if not todo:
+        return
+    texts = [jd.jd_text for jd in todo]
+    embs = encode_normalized(texts + [s for jd in todo for s in jd.jd_skills])
+    offset = len(todo)
+    for i, jd in enumerate(todo):
+        if embs is None:
+            jd._embeddings = (None, None)
+            continue
+        end = offset + len(jd.jd_skills)
+        jd._embeddings = (embs[i], embs[offset:end])
+        offset = end
+
+
+def get_jd_text_embedding(job: Optional[Dict[str, object]]) -> Optional[np.ndarray]:
+    """Normalised JD text embedding (cached with the JD features), or None."""
+    jd = get_jd_features(job)
+    if not jd.jd_text:
+        return None
+    _prime_jd_embeddings([jd])
+    return jd.embeddings()[0]
+
+
+def _build_result(
+    features: CVFeatures,
+    jd: JDFeatures,
+    coverage: float,
+    missing: List[str],
+    matched: List[str],
+    similarity: float,
+) -> CVProcessResult:
+    coverage = max(0.0, min(1.0, float(coverage)))
+    similarity = max(0.0, min(1.0, float(similarity)))
+    passed = bool(coverage >= jd.threshold) if jd.jd_skills else False
 
     return CVProcessResult(
-        cv_skills=cv_skills,
-        jd_skills=jd_skills,
+        cv_skills=features.cv_skills,
+        jd_skills=jd.jd_skills,
         matched=matched,
         missing=missing,
         coverage=coverage,
         similarity=similarity,
         passed=passed,
-        predicted_role=predicted_role,
-        quality_warnings=quality_warnings,
-        course_suggestions=course_suggestions,
+        predicted_role=features.predicted_role,
+        quality_warnings=features.quality_warnings,
+        course_suggestions=suggest_courses(missing),
+        partial_matches=partial_credit_neighbors(missing, features.cv_skills),
+    )
+
+
+def score_cv_features_batch(
+    features: CVFeatures, jobs: Sequence[Optional[Dict[str, object]]]
+) -> List[CVProcessResult]:
+    """Deterministic scoring of one CV bundle against many jobs.
+
+    JD embeddings are encoded in one batch and the text/skill similarities
+    come from one matrix product each instead of one per job.
+    """
+    jds = [get_jd_features(job) for job in jobs]
+    _prime_jd_embeddings(jds)
+    cv_text_emb, cv_skill_embs = features.embeddings()
+
+    similarities = [0.0] * len(jds)
+    with_text = [i for i, jd in enumerate(jds) if jd.jd_text]
+    text_embs = [jds[i].embeddings()[0] for i in with_text]
+    if cv_text_emb is not None and with_text and all(e is not None for e in text_embs):
+        for i, sim in zip(with_text, (np.stack(text_embs) @ cv_text_emb).tolist()):
+            similarities[i] = sim
+    else:
+        for i in with_text:
+            similarities[i] = lexical_similarity(features.cv_text, jds[i].jd_text)
+
+    # Best CV match for every required skill of every job, in one product.
+    best_by_job: Dict[int, np.ndarray] = {}
+    skill_blocks = [(i, jds[i].embeddings()[1]) for i in with_text if jds[i].jd_skills]
+    if (
+        cv_skill_embs is not None
+        and cv_skill_embs.size
+        and skill_blocks
+        and all(embs is not None and embs.size for _, embs in skill_blocks)
+    ):
+        best = (np.concatenate([embs for _, embs in skill_blocks]) @ cv_skill_embs.T).max(axis=1)
+        offset = 0
+        for i, embs in skill_blocks:
+            best_by_job[i] = best[offset : offset + embs.shape[0]]
+            offset += embs.shape[0]
+
+    results: List[CVProcessResult] = []
+    for i, jd in enumerate(jds):
+        if i in best_by_job:
+            coverage, missing, matched = coverage_from_best(jd.jd_skills, best_by_job[i])
+        else:
+            coverage, missing, matched = coverage_from_embeddings(
+                features.cv_skills, cv_skill_embs, jd.jd_skills, None
+            )
+        results.append(_build_result(features, jd, coverage, missing, matched, similarities[i]))
+    return results
+
+
+def score_cv_features(
+    features: CVFeatures, job: Optional[Dict[str, object]] = None
+) -> CVProcessResult:
+    """Cheap per-job deterministic scoring of a pre-built CV feature bundle."""
+    return score_cv_features_batch(features, [job])[0]
+
+
+def build_deterministic_analysis(
+    cv_text: str, job: Optional[Dict[str, object]] = None
+) -> CVProcessResult:
+    """SBERT/skills-only analysis; no network calls."""
+    return score_cv_features(get_cv_features(cv_text), job)
+
+
+def merge_gemini_result(
+    base: CVProcessResult,
+    gemini_result: Optional[Dict[str, object]],
+    threshold: float,
+) -> CVProcessResult:
+    if not gemini_result:
+        return base
+    cv_skills = list(gemini_result.get("cv_skills", base.cv_skills) or base.cv_skills)
+    jd_skills = list(gemini_result.get("jd_skills", base.jd_skills) or base.jd_skills)
+    matched = list(gemini_result.get("matched", base.matched) or base.matched)
+    missing = list(gemini_result.get("missing", base.missing) or base.missing)
+    coverage = gemini_result.get("coverage", base.coverage) or base.coverage
+    similarity = gemini_result.get("similarity", base.similarity) or base.similarity
+    coverage = max(0.0, min(1.0, float(coverage)))  # type: ignore[arg-type]
+    similarity = max(0.0, min(1.0, float(similarity)))  # type: ignore[arg-type]
+    predicted_role = gemini_result.get("predicted_role") or base.predicted_role or "Unknown"
+    quality_warnings = list(gemini_result.get("quality_warnings") or base.quality_warnings)
+    course_suggestions = list(
+        gemini_result.get("course_suggestions") or base.course_suggestions
+    )
+    passed = bool(coverage >= threshold) if jd_skills else base.passed
+
+    return base.model_copy(
+        update={
+            "cv_skills": cv_skills,
+            "jd_skills": jd_skills,
+            "matched": matched,
+            "missing": missing,
+            "coverage": coverage,
+            "similarity": similarity,
+            "passed": passed,
+            "predicted_role": predicted_role,
+            "quality_warnings": quality_warnings,
+            "course_suggestions": course_suggestions,
+            "partial_matches": partial_credit_neighbors(missing, cv_skills),
+        }
+    )
+
+
+def enrich_analysis(
+    base: CVProcessResult, cv_text: str, job: Optional[Dict[str, object]] = None
+) -> CVProcessResult:
+    """Blocking Gemini enrichment of a deterministic result.
+
+    ``enrichment_status`` is "completed", or "failed" (with ``base``'s scores)
+    when Gemini returned nothing.
+    """
+    gemini_result = analyze_cv_with_gemini(
+        cv_text=cv_text,
+        jd_text=_job_jd_text(job),
+        fallback_cv_skills=base.cv_skills,
+        fallback_jd_skills=base.jd_skills,
+    )
+    result = merge_gemini_result(base, gemini_result, _job_threshold(job))
+    if gemini_result:
+        analysis_cache_service.put(
+            analysis_cache_service.analysis_key(cv_text_hash(cv_text), job),  # type: ignore[arg-type]
+            result,
+        )
+    return result.model_copy(
+        update={"enrichment_status": "completed" if gemini_result else "failed"}
+    )
+
+
+def _cache_late_enrichment(future, cache_key, base: CVProcessResult, threshold: float) -> None:
+    try:
+        gemini_result = future.result()
+    except Exception:
+        return
+    if gemini_result:
+        analysis_cache_service.put(cache_key, merge_gemini_result(base, gemini_result, threshold))
+
+
+def _submit_gemini(features: CVFeatures, jd: JDFeatures) -> Future:
+    return gemini_service.submit(
+        analyze_cv_with_gemini,
+        cv_text=features.cv_text,
+        jd_text=jd.jd_text,
+        fallback_cv_skills=features.cv_skills,
+        fallback_jd_skills=jd.jd_skills,
     )
+
+
+def _finish_enrichment(
+    future: Future, cache_key, base: CVProcessResult, threshold: float
+) -> CVProcessResult:
+    try:
+        gemini_result = future.result()
+    except Exception:
+        gemini_result = None
+    result = merge_gemini_result(base, gemini_result, threshold)
+    # A failed Gemini call is not cached so the next request retries it.
+    if gemini_result:
+        analysis_cache_service.put(cache_key, result)
+    return result.model_copy(
+        update={"enrichment_status": "completed" if gemini_result else "failed"}
+    )
+
+
+def iter_analyse_cv_features(
+    features: CVFeatures,
+    jobs: Sequence[Optional[Dict[str, object]]],
+    budget: Optional[float] = None,
+    max_concurrency: int = GEMINI_PER_REQUEST_CONCURRENCY,
+) -> Iterator[Tuple[int, CVProcessResult]]:
+    """Full analyses of one CV bundle against ``jobs``, yielded as they finish.
+
+    Yields ``(index into jobs, result)``: cache hits first, then each job as
+    its Gemini call completes. ``enrichment_status`` on each result is
+    "completed", "failed", "pending" (budget ran out mid-call), "deferred"
+    (never sent before the budget ran out) or "skipped" (Gemini disabled).
+    At most ``max_concurrency`` Gemini calls are in flight for this call (the
+    shared pool caps the global total). With a ``budget`` (seconds) the calls
+    still running when it expires yield the deterministic result marked
+    ``degraded``; those calls keep running and fill the analysis cache, while
+    jobs not yet submitted are not sent.
+    """
+    started = time.monotonic()
+    enabled = gemini_service.gemini_available()
+    # Cache entries under a Gemini-enabled key only ever hold enriched results.
+    cached_status = "completed" if enabled else "skipped"
+    misses: List[Tuple[int, Optional[Dict[str, object]], object]] = []
+    for index, job in enumerate(jobs):
+        cache_key = analysis_cache_service.analysis_key(features.cv_hash, job)  # type: ignore[arg-type]
+        cached = analysis_cache_service.get(cache_key)
+        if cached is not None:
+            yield index, cached.model_copy(update={"enrichment_status": cached_status})
+        else:
+            misses.append((index, job, cache_key))
+    if not misses:
+        return
+    jds = [get_jd_features(job) for _, job, _ in misses]
+    # Gemini only needs the raw skill lists, so start it before local scoring
+    # (embeddings, coverage, courses) and merge once both are done.
+    futures: Dict[Future, int] = {}
+    queued = list(range(len(jds))) if enabled else []
+    queued.reverse()  # pop() from the end submits in job order
+    limit = max(1, max_concurrency)
+
+    def _fill() -> None:
+        while queued and len(futures) < limit:
+            pos = queued.pop()
+            futures[_submit_gemini(features, jds[pos])] = pos
+
+    _fill()
+    bases = score_cv_features_batch(features, [job for _, job, _ in misses])
+
+    if not futures:
+        for (index, _, cache_key), base in zip(misses, bases):
+            analysis_cache_service.put(cache_key, base)
+            yield index, base.model_copy(update={"enrichment_status": "skipped"})
+        return
+
+    deadline = None if budget is None else started + budget
+    while futures:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            pos = futures.pop(future)
+            index, _, cache_key = misses[pos]
+            yield index, _finish_enrichment(future, cache_key, bases[pos], jds[pos].threshold)
+        _fill()
+    for pos in queued:
+        yield misses[pos][0], bases[pos].model_copy(
+            update={"degraded": True, "enrichment_status": "deferred"}
+        )
+    for future, pos in futures.items():
+        index, _, cache_key = misses[pos]
+        future.add_done_callback(
+            lambda fut, key=cache_key, base=bases[pos], threshold=jds[pos].threshold: (
+                _cache_late_enrichment(fut, key, base, threshold)
+            )
+        )
+        yield index, bases[pos].model_copy(
+            update={"degraded": True, "enrichment_status": "pending"}
+        )
+
+
+def analyse_cv_features_batch(
+    features: CVFeatures,
+    jobs: Sequence[Optional[Dict[str, object]]],
+    budget: Optional[float] = None,
+    max_concurrency: int = GEMINI_PER_REQUEST_CONCURRENCY,
+) -> List[CVProcessResult]:
+    """``iter_analyse_cv_features`` collected back into job order."""
+    results: List[Optional[CVProcessResult]] = [None] * len(jobs)
+    for index, result in iter_analyse_cv_features(features, jobs, budget, max_concurrency):
+        results[index] = result
+    return results  # type: ignore[return-value]
+
+
+def analyse_cv_features(
+    features: CVFeatures,
+    job: Optional[Dict[str, object]] = None,
+    budget: Optional[float] = None,
+) -> CVProcessResult:
+    """Full analysis (deterministic + Gemini) of a CV bundle against one job."""
+    return analyse_cv_features_batch(features, [job], budget)[0]
+
+
+def build_cv_analysis(
+    cv_text: str,
+    job: Optional[Dict[str, object]] = None,
+    budget: Optional[float] = None,
+    similar_cv_texts: Sequence[str] = (),
+) -> CVProcessResult:
+    """Full analysis of ``cv_text`` against ``job``.
+
+    ``similar_cv_texts`` are near-identical CVs (see ``dedup_service``); a
+    cached analysis of any of them against the same job is reused instead of
+    analysing this CV again.
+    """
+    key = analysis_cache_service.analysis_key(cv_text_hash(cv_text), job)  # type: ignore[arg-type]
+    if analysis_cache_service.get(key) is None:
+        for text in similar_cv_texts:
+            cached = analysis_cache_service.get(
+                analysis_cache_service.analysis_key(cv_text_hash(text), job)  # type: ignore[arg-type]
+            )
+            if cached is not None:
+                analysis_cache_service.put(key, cached)
+                break
+    return analyse_cv_features(get_cv_features(cv_text), job, budget)
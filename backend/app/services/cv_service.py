@@ -1,5 +1,5 @@
 import io
-from typing import Optional
+from typing import BinaryIO, Optional
 
 try:
     import pdfplumber  # type: ignore
@@ -11,35 +11,49 @@ try:
 except Exception:
     docx = None
 
-def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
+def _pdf_text(source: BinaryIO) -> str:
     if not pdfplumber:
         return ""
     try:
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        with pdfplumber.open(source) as pdf:
             pages = [page.extract_text() or "" for page in pdf.pages]
         return "\n".join(pages)
     except Exception:
         return ""
 
-def extract_text_from_docx_bytes(file_bytes: bytes) -> str:
+def _docx_text(source: BinaryIO) -> str:
     if not docx:
         return ""
     try:
-        bio = io.BytesIO(file_bytes)
-        d = docx.Document(bio)
+        d = docx.Document(source)
         return "\n".join([p.text for p in d.paragraphs])
     except Exception:
         return ""
 
-def extract_text_generic_from_bytes(filename: str, data: bytes) -> str:
+def _extract_text(filename: str, source: BinaryIO) -> str:
     name = (filename or "").lower()
     if name.endswith(".pdf"):
-        return extract_text_from_pdf_bytes(data)
+        return _pdf_text(source)
     if name.endswith(".docx"):
-        return extract_text_from_docx_bytes(data)
+        return _docx_text(source)
     try:
-        return data.decode("utf-8", errors="ignore")
+        return source.read().decode("utf-8", errors="ignore")
     except Exception:
         return ""
 
+def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
+    return _pdf_text(io.BytesIO(file_bytes))
+
+def extract_text_from_docx_bytes(file_bytes: bytes) -> str:
+    return _docx_text(io.BytesIO(file_bytes))
+
+def extract_text_generic_from_bytes(filename: str, data: bytes) -> str:
+    return _extract_text(filename, io.BytesIO(data))
 
+def extract_text_from_path(path: str, filename: Optional[str] = None) -> str:
+    """Like extract_text_generic_from_bytes, but parses a stored file in place."""
+    try:
+        with open(path, "rb") as fh:
+            return _extract_text(filename or str(path), fh)
+    except OSError:
+        return ""
@@ -0,0 +1,228 @@
+"""MinHash signatures and LSH banding for near-duplicate JDs and CVs.
+
+Signatures are computed when a job or an applicant log is written and stored
+next to the text (``jobs.jd_minhash`` / ``processed.cv_minhash``). The LSH
+indexes live in memory and are rebuilt from those columns on first use.
+Lookups take the stored blob where there is one, so the text is only
+re-hashed for rows written before signatures existed.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # ~0.7 Jaccard detection threshold
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+REUSE_THRESHOLD = 0.95  # close enough to reuse another CV's analysis
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_rng = np.random.RandomState(20240601)  # fixed seed: signatures are persisted
+_PERM_A = _rng.randint(1, 2**31 - 1, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2**31 - 1, size=NUM_PERM).astype(np.uint64)
+
+
+def _shingles(text: str) -> np.ndarray:
+    tokens = re.findall(r"\w+", (text or "").lower())
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+    if len(tokens) < SHINGLE_SIZE:
+        grams = [" ".join(tokens)]
+    else:
+        grams = [
+            " ".join(tokens[i : i + SHINGLE_SIZE])
+            for i in range(len(tokens) - SHINGLE_SIZE + 1)
+        ]
+    hashes = {zlib.crc32(g.encode("utf-8")) for g in grams}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    shingles = _shingles(text)
+    if not shingles.size:
+        return None
+    # (a * x + b) mod p for every permutation x shingle, min over shingles
+    hashed = (np.outer(_PERM_A, shingles) + _PERM_B[:, None]) % _PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def signature_blob(text: str) -> Optional[bytes]:
+    signature = minhash_signature(text)
+    return signature.tobytes() if signature is not None else None
+
+
+def blob_to_signature(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    if not blob:
+        return None
+    signature = np.frombuffer(bytes(blob), dtype=np.uint32)
+    return signature if signature.size == NUM_PERM else None
+
+
+def _signature_for(text: str, blob: Optional[bytes]) -> Optional[np.ndarray]:
+    signature = blob_to_signature(blob)
+    return signature if signature is not None else minhash_signature(text)
+
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures keyed by integer row ids."""
+
+    def __init__(self) -> None:
+        self._buckets: List[Dict[bytes, Set[int]]] = [dict() for _ in range(BANDS)]
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _band_keys(signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(BANDS):
+            yield band, signature[band * ROWS : (band + 1) * ROWS].tobytes()
+
+    def add(self, key: int, signature: np.ndarray) -> None:
+        with self._lock:
+            self._remove_locked(key)
+            self._signatures[key] = signature
+            for band, band_key in self._band_keys(signature):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key: int) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: int) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is None:
+                continue
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band][band_key]
+
+    def query(
+        self,
+        signature: np.ndarray,
+        threshold: float = DUPLICATE_THRESHOLD,
+        exclude: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        with self._lock:
+            candidates: Set[int] = set()
+            for band, band_key in self._band_keys(signature):
+                candidates.update(self._buckets[band].get(band_key, ()))
+            candidates.discard(exclude)  # type: ignore[arg-type]
+            scored = [
+                (key, estimate_jaccard(signature, self._signatures[key]))
+                for key in candidates
+            ]
+        scored = [(key, round(score, 4)) for key, score in scored if score >= threshold]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+
+_JOB_INDEX: Optional[LSHIndex] = None
+_CV_INDEX: Optional[LSHIndex] = None
+_BUILD_LOCK = threading.Lock()
+
+
+def _build_index(
+    rows: List[Dict[str, object]],
+    text_key: str,
+    blob_key: str,
+    store: Callable[[int, bytes], object],
+) -> LSHIndex:
+    index = LSHIndex()
+    for row in rows:
+        signature = blob_to_signature(row.get(blob_key))  # type: ignore[arg-type]
+        if signature is None:
+            # Rows written before signatures existed are backfilled once.
+            blob = signature_blob(str(row.get(text_key) or ""))
+            if blob is None:
+                continue
+            store(int(row["id"]), blob)  # type: ignore[arg-type]
+            signature = blob_to_signature(blob)
+        index.add(int(row["id"]), signature)  # type: ignore[arg-type]
+    return index
+
+
+def _job_index() -> LSHIndex:
+    global _JOB_INDEX
+    if _JOB_INDEX is None:
+        from app.dao.jobs_dao import list_job_signatures, set_job_signature
+
+        with _BUILD_LOCK:
+            if _JOB_INDEX is None:
+                _JOB_INDEX = _build_index(
+                    list_job_signatures(), "jd_text", "jd_minhash", set_job_signature
+                )
+    return _JOB_INDEX
+
+
+def _cv_index() -> LSHIndex:
+    global _CV_INDEX
+    if _CV_INDEX is None:
+        from app.dao.processed_dao import list_cv_signatures, set_cv_signature
+
+        with _BUILD_LOCK:
+            if _CV_INDEX is None:
+                _CV_INDEX = _build_index(
+                    list_cv_signatures(), "cv_text", "cv_minhash", set_cv_signature
+                )
+    return _CV_INDEX
+
+
+def index_job(job_id: int, blob: Optional[bytes]) -> None:
+    signature = blob_to_signature(blob)
+    if signature is None:
+        _job_index().remove(int(job_id))
+    else:
+        _job_index().add(int(job_id), signature)
+
+
+def remove_job(job_id: int) -> None:
+    _job_index().remove(int(job_id))
+
+
+def find_duplicate_jobs(
+    job_id: int,
+    jd_text: str = "",
+    threshold: float = DUPLICATE_THRESHOLD,
+    blob: Optional[bytes] = None,
+) -> List[Tuple[int, float]]:
+    signature = _signature_for(jd_text, blob)
+    if signature is None:
+        return []
+    return _job_index().query(signature, threshold, exclude=int(job_id))
+
+
+def index_cv(processed_id: int, blob: Optional[bytes]) -> None:
+    signature = blob_to_signature(blob)
+    if signature is not None:
+        _cv_index().add(int(processed_id), signature)
+
+
+def remove_cv(processed_id: int) -> None:
+    _cv_index().remove(int(processed_id))
+
+
+def find_duplicate_cvs(
+    cv_text: str = "",
+    threshold: float = DUPLICATE_THRESHOLD,
+    blob: Optional[bytes] = None,
+    exclude: Optional[int] = None,
+) -> List[Tuple[int, float]]:
+    """Return ``(processed id, similarity)`` for near-duplicates of ``cv_text``, best first."""
+    signature = _signature_for(cv_text, blob)
+    if signature is None:
+        return []
+    return _cv_index().query(signature, threshold, exclude=exclude)
@@ -33,14 +33,8 @@ def _encode_texts(texts: List[str]) -> Optional[np.ndarray]:
     if model is None:
         return None
     # Use simple cache per full string
-    results: List[np.ndarray] = []
-    to_compute: List[str] = []
-    for t in texts:
-        key = t.strip() if t else ""
-        if key in _EMB_CACHE:
-            results.append(_EMB_CACHE[key])
-        else:
-            to_compute.append(key)
+    keys = [t.strip() if t else "" for t in texts]
+    to_compute = list(dict.fromkeys(k for k in keys if k not in _EMB_CACHE))
     if to_compute:
         embs = model.encode(to_compute, show_progress_bar=False)
         # ensure np.ndarray list
@@ -49,35 +43,45 @@ def _encode_texts(texts: List[str]) -> Optional[np.ndarray]:
         else:
             seq = list(embs)
         for k, e in zip(to_compute, seq):
-            arr = np.asarray(e)
-            _EMB_CACHE[k] = arr
-            results.append(arr)
+            _EMB_CACHE[k] = np.asarray(e)
+    # rows follow the input order, cached or not
+    results = [_EMB_CACHE[k] for k in keys]
     return np.stack(results) if results else np.zeros((0, 384), dtype=float)
 
+def model_version() -> str:
+    """Identifies the scoring backend so cached results can be versioned."""
+    model = _try_load_model()
+    if model is None:
+        return "lexical"
+    return f"sbert:{MODEL_LOCAL_PATH}|{MODEL_FALLBACK_NAME}"
+
+def encode_normalized(texts: List[str]) -> Optional[np.ndarray]:
+    """L2-normalised embeddings (one row per text), or None without a model."""
+    embs = _encode_texts(texts)
+    if embs is None:
+        return None
+    norms = np.linalg.norm(embs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embs / norms
+
 def _cosine(a: np.ndarray, b: np.ndarray) -> float:
     denom = (np.linalg.norm(a) * np.linalg.norm(b))
     if denom == 0:
         return 0.0
     return float(np.dot(a, b) / denom)
 
-def coverage_score(cv_skills: List[str], req_skills: List[str], threshold: float = 0.6) -> Tuple[float, List[str], List[str]]:
-    """Nếu có SBERT: match theo cosine > threshold, ngược lại: giao chuỗi."""
+def coverage_from_embeddings(
+    cv_skills: List[str],
+    cv_embs: Optional[np.ndarray],
+    req_skills: List[str],
+    req_embs: Optional[np.ndarray],
+    threshold: float = 0.6,
+) -> Tuple[float, List[str], List[str]]:
+    """coverage_score on pre-computed, L2-normalised skill embeddings."""
     if not req_skills:
         return 1.0, [], []
-    # Try embedding path
-    cv_embs = _encode_texts(cv_skills)
-    req_embs = _encode_texts(req_skills)
     if cv_embs is not None and req_embs is not None and cv_embs.size and req_embs.size:
-        matched_idx: List[int] = []
-        for i in range(req_embs.shape[0]):
-            r = req_embs[i]
-            sims = [ _cosine(r, c) for c in cv_embs ]
-            if sims and max(sims) >= threshold:
-                matched_idx.append(i)
-        matched = [req_skills[i] for i in matched_idx]
-        missing = [req_skills[i] for i in range(len(req_skills)) if i not in matched_idx]
-        cov = len(matched) / max(1, len(req_skills))
-        return cov, missing, matched
+        return coverage_from_best(req_skills, (req_embs @ cv_embs.T).max(axis=1), threshold)
     # Fallback: string intersection
     cv_set = set(cv_skills or [])
     req_set = set(req_skills or [])
@@ -86,17 +90,43 @@ def coverage_score(cv_skills: List[str], req_skills: List[str], threshold: float
     coverage = len(matched) / max(1, len(req_skills))
     return coverage, missing, matched
 
-def semantic_similarity(text1: str, text2: str) -> float:
+def coverage_from_best(
+    req_skills: List[str], best: np.ndarray, threshold: float = 0.6
+) -> Tuple[float, List[str], List[str]]:
+    """Coverage given each required skill's best cosine against the CV skills."""
+    hits = best >= threshold
+    matched = [s for s, hit in zip(req_skills, hits) if hit]
+    missing = [s for s, hit in zip(req_skills, hits) if not hit]
+    cov = len(matched) / max(1, len(req_skills))
+    return cov, missing, matched
+
+def coverage_score(cv_skills: List[str], req_skills: List[str], threshold: float = 0.6) -> Tuple[float, List[str], List[str]]:
+    """Nếu có SBERT: match theo cosine > threshold, ngược lại: giao chuỗi."""
+    if not req_skills:
+        return 1.0, [], []
+    return coverage_from_embeddings(
+        cv_skills,
+        encode_normalized(cv_skills),
+        req_skills,
+        encode_normalized(req_skills),
+        threshold,
+    )
+
+def lexical_similarity(text1: str, text2: str) -> float:
+    """Jaccard overlap of word sets; used when no embedding model is loaded."""
     if not text1 or not text2:
         return 0.0
-    embs = _encode_texts([text1, text2])
-    if embs is not None and embs.shape[0] == 2:
-        return _cosine(embs[0], embs[1])
-    # Fallback Jaccard
     s1 = set(re.findall(r"\w+", text1.lower()))
     s2 = set(re.findall(r"\w+", text2.lower()))
     if not s1 or not s2:
         return 0.0
     return float(len(s1 & s2) / max(1, len(s1 | s2)))
 
-
+def semantic_similarity(text1: str, text2: str) -> float:
+    if not text1 or not text2:
+        return 0.0
+    embs = _encode_texts([text1, text2])
+    if embs is not None and embs.shape[0] == 2:
+        return _cosine(embs[0], embs[1])
+    # Fallback Jaccard
+    return lexical_similarity(text1, text2)
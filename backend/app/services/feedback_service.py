@@ -1,80 +1,20 @@
-import re
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from app.services import course_catalog_service, skill_graph_service
+from app.services.cv_document_service import CVDocument, analyse_document
 
 
 CVWarning = Dict[str, str]
 CourseSuggestion = Dict[str, str]
 
-_COURSE_LIBRARY: Dict[str, List[CourseSuggestion]] = {
-    "python": [
-        {
-            "skill": "Python",
-            "title": "Python for Everybody",
-            "provider": "Coursera",
-            "url": "https://www.coursera.org/specializations/python",
-        },
-        {
-            "skill": "Python",
-            "title": "Automate the Boring Stuff with Python",
-            "provider": "Udemy",
-            "url": "https://www.udemy.com/course/automate/",
-        },
-    ],
-    "sql": [
-        {
-            "skill": "SQL",
-            "title": "SQL for Data Analysis",
-            "provider": "Mode",
-            "url": "https://mode.com/sql-tutorial/",
-        },
-        {
-            "skill": "SQL",
-            "title": "Advanced SQL for Data Scientists",
-            "provider": "DataCamp",
-            "url": "https://www.datacamp.com/courses/advanced-sql-for-data-scientists",
-        },
-    ],
-    "javascript": [
-        {
-            "skill": "JavaScript",
-            "title": "JavaScript Algorithms and Data Structures",
-            "provider": "freeCodeCamp",
-            "url": "https://www.freecodecamp.org/learn/javascript-algorithms-and-data-structures/",
-        }
-    ],
-    "machine learning": [
-        {
-            "skill": "Machine Learning",
-            "title": "Machine Learning Specialization",
-            "provider": "Coursera",
-            "url": "https://www.coursera.org/specializations/machine-learning-introduction",
-        }
-    ],
-    "excel": [
-        {
-            "skill": "Excel",
-            "title": "Excel Skills for Business",
-            "provider": "Coursera",
-            "url": "https://www.coursera.org/specializations/excel",
-        }
-    ],
-    "communication": [
-        {
-            "skill": "Communication",
-            "title": "Improving Communication Skills",
-            "provider": "Coursera",
-            "url": "https://www.coursera.org/learn/wharton-communication-skills",
-        }
-    ],
-}
-
 
-def analyse_cv_quality(cv_text: str, cv_skills: List[str]) -> List[CVWarning]:
+def analyse_cv_quality(
+    cv_text: str, cv_skills: List[str], doc: Optional[CVDocument] = None
+) -> List[CVWarning]:
     warnings: List[CVWarning] = []
-    text = cv_text or ""
-    lowered = text.lower()
+    doc = doc or analyse_document(cv_text)
 
-    if not re.search(r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[A-Za-z]{2,}\b", text):
+    if not doc.has_email:
         warnings.append(
             {
                 "issue": "Missing email address",
@@ -83,7 +23,7 @@ def analyse_cv_quality(cv_text: str, cv_skills: List[str]) -> List[CVWarning]:
             }
         )
 
-    if not re.search(r"\+?\d[\d\s\-]{7,}", text):
+    if not doc.has_phone:
         warnings.append(
             {
                 "issue": "Missing phone number",
@@ -92,8 +32,7 @@ def analyse_cv_quality(cv_text: str, cv_skills: List[str]) -> List[CVWarning]:
             }
         )
 
-    word_count = len(re.findall(r"\w+", text))
-    if word_count < 150:
+    if doc.word_count < 150:
         warnings.append(
             {
                 "issue": "CV may be too short",
@@ -102,7 +41,7 @@ def analyse_cv_quality(cv_text: str, cv_skills: List[str]) -> List[CVWarning]:
             }
         )
 
-    if "experience" not in lowered:
+    if "experience" not in doc.sections:
         warnings.append(
             {
                 "issue": "Experience section not detected",
@@ -111,7 +50,7 @@ def analyse_cv_quality(cv_text: str, cv_skills: List[str]) -> List[CVWarning]:
             }
         )
 
-    if "education" not in lowered:
+    if "education" not in doc.sections:
         warnings.append(
             {
                 "issue": "Education section not detected",
@@ -120,7 +59,7 @@ def analyse_cv_quality(cv_text: str, cv_skills: List[str]) -> List[CVWarning]:
             }
         )
 
-    if "skill" not in lowered and not cv_skills:
+    if "skill" not in doc.sections and not cv_skills:
         warnings.append(
             {
                 "issue": "Skills section not detected",
@@ -144,19 +83,19 @@ def analyse_cv_quality(cv_text: str, cv_skills: List[str]) -> List[CVWarning]:
 def suggest_courses(missing_skills: List[str]) -> List[CourseSuggestion]:
     suggestions: List[CourseSuggestion] = []
     seen = set()
-    for skill in missing_skills:
-        key = skill.lower()
-        matched_key = None
-        if key in _COURSE_LIBRARY:
-            matched_key = key
-        else:
-            for library_key in _COURSE_LIBRARY.keys():
-                if library_key in key:
-                    matched_key = library_key
+    for skill, (matched_key, courses) in zip(
+        missing_skills, course_catalog_service.lookup_many(missing_skills)
+    ):
+        if not matched_key:
+            # No course for the skill itself: fall back to the skill it most
+            # often appears with in job postings.
+            for related, _ in skill_graph_service.related_skills(skill, top_n=3, min_score=0.2):
+                matched_key, courses = course_catalog_service.lookup(related, semantic=False)
+                if matched_key:
                     break
         if not matched_key:
             continue
-        for course in _COURSE_LIBRARY[matched_key]:
+        for course in courses:
             marker = (course["title"], course["url"])
             if marker in seen:
                 continue
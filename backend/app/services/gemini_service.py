@@ -1,9 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Dict, List, Optional, Sequence
-
-from app.core.config import GEMINI_MODEL_INTERVIEW, GOOGLE_API_KEY
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import (
+    ANALYSIS_CACHE_MAX_ENTRIES,
+    ANALYSIS_CACHE_TTL_SECONDS,
+    GEMINI_MAX_CONCURRENCY,
+    GEMINI_MODEL_INTERVIEW,
+    GOOGLE_API_KEY,
+)
 from app.services.skills_service import extract_skills
 
 try:
@@ -14,6 +25,9 @@ except ImportError:  # pragma: no cover
 _MODEL = None
 _ENABLED = False
 
+# Bump when the CV analysis prompt or its parsing changes.
+CV_ANALYSIS_PROMPT_VERSION = "1"
+
 if genai and GOOGLE_API_KEY:
     try:
         genai.configure(api_key=GOOGLE_API_KEY)
@@ -23,6 +37,18 @@ if genai and GOOGLE_API_KEY:
         _MODEL = None
         _ENABLED = False
 
+# Shared pool for Gemini calls that run off the request thread.
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(1, GEMINI_MAX_CONCURRENCY), thread_name_prefix="gemini"
+)
+
+# Results of call_with_budget calls that finished after their budget ran out,
+# keyed by (function, arguments); the next identical call is served from here.
+_LATE_RESULTS: TTLCache[Any] = TTLCache(ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL_SECONDS)
+
+# Per-thread hook run before each submission (see ``throttled``).
+_THROTTLE = threading.local()
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -32,6 +58,114 @@ def gemini_available() -> bool:
     return _ENABLED and _MODEL is not None
 
 
+def cv_analysis_version() -> str:
+    if not gemini_available():
+        return "off"
+    return f"{GEMINI_MODEL_INTERVIEW}:{CV_ANALYSIS_PROMPT_VERSION}"
+
+
+@contextmanager
+def throttled(before_submit: Callable[[], None]) -> Iterator[None]:
+    """Call ``before_submit`` before every Gemini call this thread submits.
+
+    Background work uses it to pace its own calls; the hook may block, or
+    raise to abandon the submission.
+    """
+    _THROTTLE.hook = before_submit
+    try:
+        yield
+    finally:
+        _THROTTLE.hook = None
+
+
+def submit(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Run ``fn`` on the shared Gemini worker pool."""
+    hook = getattr(_THROTTLE, "hook", None)
+    if hook is not None:
+        hook()
+    return _EXECUTOR.submit(fn, *args, **kwargs)
+
+
+def wait_within_budget(future: Future, budget: Optional[float]) -> Tuple[Any, bool]:
+    """Wait for ``future`` up to ``budget`` seconds; return (result, timed_out).
+
+    On timeout the call keeps running on the pool, so any done-callbacks
+    (e.g. cache writes) still fire.
+    """
+    try:
+        return future.result(timeout=budget), False
+    except FutureTimeout:
+        return None, True
+    except Exception:
+        return None, False
+
+
+def _late_key(
+    fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]
+) -> Optional[Hashable]:
+    key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _keep_late_result(key: Optional[Hashable], future: Future) -> None:
+    """Once the timed-out call finishes, keep its result for the next identical call."""
+    if key is None:
+        return
+
+    def _store(done: Future) -> None:
+        try:
+            result = done.result()
+        except Exception:
+            return
+        if result:
+            _LATE_RESULTS.put(key, result)
+
+    future.add_done_callback(_store)
+
+
+def call_with_budget(
+    fn: Callable[..., Any], *args: Any, budget: Optional[float] = None, **kwargs: Any
+) -> Tuple[Any, bool]:
+    """Run ``fn`` on the pool and wait up to ``budget`` seconds for it.
+
+    A call that times out keeps running; its result is kept and returned by
+    the next call with the same arguments instead of paying for it again.
+    """
+    key = _late_key(fn, args, kwargs)
+    late = _LATE_RESULTS.get(key) if key is not None else None
+    if late is not None:
+        return late, False
+    future = submit(fn, *args, **kwargs)
+    result, timed_out = wait_within_budget(future, budget)
+    if timed_out:
+        _keep_late_result(key, future)
+    return result, timed_out
+
+
+async def call_with_budget_async(
+    fn: Callable[..., Any], *args: Any, budget: Optional[float] = None, **kwargs: Any
+) -> Tuple[Any, bool]:
+    """Event-loop friendly variant of call_with_budget for ``async def`` routes."""
+    key = _late_key(fn, args, kwargs)
+    late = _LATE_RESULTS.get(key) if key is not None else None
+    if late is not None:
+        return late, False
+    future = submit(fn, *args, **kwargs)
+    # asyncio.wait does not cancel the underlying call on timeout
+    done, _ = await asyncio.wait({asyncio.wrap_future(future)}, timeout=budget)
+    if not done:
+        _keep_late_result(key, future)
+        return None, True
+    try:
+        return future.result(), False
+    except Exception:
+        return None, False
+
+
 def _clean_json_text(raw: str) -> str:
     cleaned = raw.strip("` \n\t")
     if cleaned.lower().startswith("json"):
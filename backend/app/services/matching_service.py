@@ -1,4 +1,6 @@
-from typing import Dict
+from typing import Dict, Optional
+
+from app.services.cv_document_service import CVDocument
 
 _ROLE_KEYWORDS: Dict[str, str] = {
     "Data Analyst": "pandas sql excel tableau power bi",
@@ -7,13 +9,13 @@ _ROLE_KEYWORDS: Dict[str, str] = {
     "Virtual Assistant": "scheduling email sheets support",
 }
 
-def predict_cv_category(cv_text: str) -> str:
+def predict_cv_category(cv_text: str, doc: Optional[CVDocument] = None) -> str:
     """Stub nhanh: đoán vai trò dựa trên keyword đơn giản.
     Có thể thay bằng SBERT hoặc classifier sau.
     """
     if not cv_text:
         return "Unknown"
-    low = cv_text.lower()
+    low = doc.lowered if doc is not None else cv_text.lower()
     best = "Unknown"
     best_hits = 0
     for role, kws in _ROLE_KEYWORDS.items():
@@ -0,0 +1,208 @@
+"""Background precompute of profile matches.
+
+Activating or editing a CV queues a full ranking of that CV (persisted
+matches plus a fresh ranking snapshot, and the CV embedding used for
+employer-side candidate search); approving a job queues scoring of
+that job against every student's active CV, one student at a time within
+that single task. A single daemon worker drains the queue and starts at most
+``PRECOMPUTE_GEMINI_CALLS_PER_MINUTE`` Gemini calls per minute, so the quota
+stays available for interactive requests. The worker also catches up stale
+candidate-search embeddings after the index is rebuilt. Tasks already waiting
+in the queue are not queued twice, and a full queue drops (and logs) new
+work: anything missed is computed on the user's next request as before.
+``stop`` ends the worker at shutdown, before the DB connections are closed.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Optional, Tuple
+
+from app.core.config import (
+    PRECOMPUTE_ENABLED,
+    PRECOMPUTE_GEMINI_CALLS_PER_MINUTE,
+    PRECOMPUTE_QUEUE_MAX,
+    PRECOMPUTE_RANK_LIMIT,
+)
+from app.core.db import release_connection
+from app.dao import users_dao
+from app.dao.jobs_dao import get_job_by_id
+from app.dao.processed_dao import list_job_ids_by_email
+from app.services import (
+    candidate_search_service,
+    gemini_service,
+    profile_ranking_service,
+    profile_service,
+)
+from app.services.cv_matching_service import get_cv_features
+
+logger = logging.getLogger(__name__)
+
+Task = Tuple  # ("cv", user_id) | ("job", job_id) | ("candidates",)
+
+_QUEUE: "queue.Queue[Task]" = queue.Queue(maxsize=PRECOMPUTE_QUEUE_MAX)
+_QUEUED: set = set()
+_LOCK = threading.Lock()
+_WORKER: Optional[threading.Thread] = None
+_STOP = threading.Event()
+_NEXT_GEMINI_CALL = 0.0  # worker thread only
+
+
+class _Stopped(Exception):
+    """Raised inside a task when ``stop`` interrupts it."""
+
+
+def _ensure_worker() -> None:
+    global _WORKER
+    if _WORKER is not None and _WORKER.is_alive():
+        return
+    _WORKER = threading.Thread(target=_run, name="profile-match-precompute", daemon=True)
+    _WORKER.start()
+
+
+def _enqueue(task: Task) -> bool:
+    if not PRECOMPUTE_ENABLED or _STOP.is_set():
+        return False
+    with _LOCK:
+        if task in _QUEUED:
+            return True
+        try:
+            _QUEUE.put_nowait(task)
+        except queue.Full:
+            logger.warning("Precompute queue full; dropped %s", task)
+            return False
+        _QUEUED.add(task)
+        _ensure_worker()
+    return True
+
+
+def enqueue_cv(user_id: int) -> bool:
+    """Rank the user's active CV against all published jobs in the background."""
+    return _enqueue(("cv", int(user_id)))
+
+
+def enqueue_job(job_id: int) -> bool:
+    """Score a newly published job against every active student CV."""
+    return _enqueue(("job", int(job_id)))
+
+
+def enqueue_candidate_backfill() -> bool:
+    """Re-embed opted-in students whose candidate-search embedding is stale."""
+    return _enqueue(("candidates",))
+
+
+def stop(timeout: float = 10.0) -> bool:
+    """Stop the worker after its current task; queued tasks are dropped.
+
+    Returns False if the worker was still busy after ``timeout`` seconds.
+    """
+    _STOP.set()
+    worker = _WORKER
+    if worker is None or not worker.is_alive():
+        return True
+    try:
+        _QUEUE.put_nowait(None)  # wake a worker blocked on an empty queue
+    except queue.Full:
+        pass  # a full queue wakes it anyway
+    worker.join(timeout)
+    return not worker.is_alive()
+
+
+def _active_student(user_id: int):
+    user = users_dao.get_user_by_id(user_id)
+    if not user or user.get("role") != "student" or user.get("is_banned"):
+        return None, None
+    return user, profile_service.get_active_cv(user_id)
+
+
+def _precompute_cv(user_id: int) -> None:
+    candidate_search_service.refresh_candidate(user_id)
+    user, active_cv = _active_student(user_id)
+    if not active_cv:
+        return
+    version, jobs = profile_ranking_service.versioned_candidate_jobs(user)
+    profile_ranking_service.rank_and_snapshot(
+        user,
+        get_cv_features(active_cv["text"]),
+        jobs,
+        version,
+        limit=PRECOMPUTE_RANK_LIMIT,
+        cv_source=active_cv["source"],
+        cv_label=active_cv["label"],
+    )
+
+
+def _fan_out_job(job_id: int) -> None:
+    for user_id in users_dao.list_student_ids_with_active_cv():
+        if _STOP.is_set():
+            return
+        try:
+            _precompute_pair(user_id, job_id)
+        except _Stopped:
+            raise
+        except Exception:
+            # That student's match is computed on their next request instead.
+            pass
+
+
+def _precompute_pair(user_id: int, job_id: int) -> None:
+    job = get_job_by_id(job_id)
+    if not job or not job.get("published"):
+        return
+    user, active_cv = _active_student(user_id)
+    if not active_cv:
+        return
+    email = (user.get("email") or "").strip()
+    if email and job_id in set(list_job_ids_by_email(email)):
+        return
+    # Draining the iterator persists the match to the profile-match history.
+    for _ in profile_ranking_service.iter_matches(
+        user_id,
+        get_cv_features(active_cv["text"]),
+        [job],
+        cv_source=active_cv["source"],
+        cv_label=active_cv["label"],
+    ):
+        pass
+
+
+def _run_task(task: Task) -> None:
+    kind = task[0]
+    if kind == "cv":
+        _precompute_cv(task[1])
+    elif kind == "job":
+        _fan_out_job(task[1])
+    elif kind == "candidates":
+        candidate_search_service.backfill_candidates()
+
+
+def _pace_gemini_call() -> None:
+    """Wait for the worker's next Gemini slot; raise ``_Stopped`` on stop."""
+    global _NEXT_GEMINI_CALL
+    if PRECOMPUTE_GEMINI_CALLS_PER_MINUTE <= 0:
+        return
+    delay = _NEXT_GEMINI_CALL - time.monotonic()
+    if delay > 0 and _STOP.wait(delay):
+        raise _Stopped()
+    _NEXT_GEMINI_CALL = time.monotonic() + 60.0 / PRECOMPUTE_GEMINI_CALLS_PER_MINUTE
+
+
+def _run() -> None:
+    with gemini_service.throttled(_pace_gemini_call):
+        while not _STOP.is_set():
+            task = _QUEUE.get()
+            if task is None or _STOP.is_set():
+                break
+            with _LOCK:
+                _QUEUED.discard(task)
+            try:
+                _run_task(task)
+            except Exception:
+                # A failed precompute is simply redone on the user's next request.
+                pass
+            finally:
+                release_connection()
+                _QUEUE.task_done()
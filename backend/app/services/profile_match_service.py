@@ -1,38 +1,217 @@
 from __future__ import annotations
 
 import json
+import sqlite3
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.core.db import get_connection
 
 
-def _now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+# Stay well under SQLITE_MAX_VARIABLE_NUMBER (999 on older builds).
+_IN_CHUNK = 500
 
+# Analysis fields that depend only on the CV. They are stored once per
+# cv_hash in profile_match_cv_facts; each history row keeps the job-specific
+# fields plus any CV field that differs from the stored facts (Gemini may
+# re-read the CV per job). Rows written before the split hold the full
+# payload and read back unchanged.
+CV_FIELDS = ("cv_skills", "predicted_role", "quality_warnings")
 
-def get_cached_match(user_id: int, job_id: int, cv_hash: str) -> Optional[Dict[str, Any]]:
+
+def _now() -> int:
+    return int(time.time())
+
+
+def _iso(epoch: Optional[int]) -> str:
+    return datetime.fromtimestamp(int(epoch or 0), timezone.utc).isoformat()
+
+
+def _load_cv_facts(cur: sqlite3.Cursor, cv_hashes) -> Dict[str, Dict[str, Any]]:
+    hashes = list(dict.fromkeys(cv_hashes))
+    facts: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(hashes), _IN_CHUNK):
+        chunk = hashes[start : start + _IN_CHUNK]
+        placeholders = ",".join("?" for _ in chunk)
+        cur.execute(
+            f"SELECT cv_hash, facts_json FROM profile_match_cv_facts WHERE cv_hash IN ({placeholders})",
+            chunk,
+        )
+        for row in cur.fetchall():
+            facts[row["cv_hash"]] = json.loads(row["facts_json"] or "{}")
+    return facts
+
+
+def _store_cv_facts(
+    cur: sqlite3.Cursor, matches: List[Dict[str, Any]], now: int
+) -> Dict[str, Dict[str, Any]]:
+    """Record CV-level facts for new cv_hashes; returns the stored facts."""
+    new_facts: Dict[str, Dict[str, Any]] = {}
+    for match in matches:
+        cv_hash = match.get("cv_hash")
+        analysis = match.get("analysis")
+        if not cv_hash or not isinstance(analysis, dict) or cv_hash in new_facts:
+            continue
+        new_facts[cv_hash] = {key: analysis[key] for key in CV_FIELDS if key in analysis}
+    if not new_facts:
+        return {}
+    cur.executemany(
+        "INSERT OR IGNORE INTO profile_match_cv_facts (cv_hash, facts_json, created_at) VALUES (?, ?, ?)",
+        [(cv_hash, json.dumps(facts), now) for cv_hash, facts in new_facts.items()],
+    )
+    return _load_cv_facts(cur, new_facts)
+
+
+def _row_to_analysis(row, facts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    analysis = {**(facts or {}), **json.loads(row["analysis_json"] or "{}")}
+    analysis["score"] = row["score"]
+    analysis["coverage"] = row["coverage"]
+    analysis["similarity"] = row["similarity"]
+    analysis["matched_at"] = _iso(row["created_at"])
+    return analysis
+
+
+def get_cached_match(
+    user_id: int, job_id: int, cv_hash: str, job_hash: str
+) -> Optional[Dict[str, Any]]:
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
         """
         SELECT score, coverage, similarity, analysis_json, created_at
         FROM profile_match_history
-        WHERE user_id=? AND job_id=? AND cv_hash=?
-        ORDER BY datetime(created_at) DESC
-        LIMIT 1
+        WHERE user_id=? AND job_id=? AND cv_hash=? AND job_hash=?
         """,
-        (user_id, job_id, cv_hash),
+        (user_id, job_id, cv_hash, job_hash),
     )
     row = cur.fetchone()
     if not row:
         return None
-    analysis = json.loads(row["analysis_json"] or "{}")
-    analysis["score"] = row["score"]
-    analysis["coverage"] = row["coverage"]
-    analysis["similarity"] = row["similarity"]
-    analysis["matched_at"] = row["created_at"]
-    return analysis
+    return _row_to_analysis(row, _load_cv_facts(cur, [cv_hash]).get(cv_hash))
+
+
+def get_cached_matches(
+    user_id: int, cv_hash: str, job_hashes: Dict[int, str]
+) -> Dict[int, Dict[str, Any]]:
+    """Bulk get_cached_match: the stored analysis per job whose content hash still matches.
+
+    ``job_hashes`` maps each candidate job ID to its current content hash.
+    """
+    found: Dict[int, Dict[str, Any]] = {}
+    job_ids = list(job_hashes)
+    if not job_ids:
+        return found
+    conn = get_connection()
+    cur = conn.cursor()
+    facts = _load_cv_facts(cur, [cv_hash]).get(cv_hash)
+    for start in range(0, len(job_ids), _IN_CHUNK):
+        chunk = job_ids[start : start + _IN_CHUNK]
+        placeholders = ",".join("?" for _ in chunk)
+        cur.execute(
+            f"""
+            SELECT job_id, job_hash, score, coverage, similarity, analysis_json, created_at
+            FROM profile_match_history
+            WHERE user_id=? AND cv_hash=? AND job_id IN ({placeholders})
+            """,
+            (user_id, cv_hash, *chunk),
+        )
+        for row in cur.fetchall():
+            job_id = int(row["job_id"])
+            if row["job_hash"] != job_hashes[job_id]:
+                continue
+            found[job_id] = _row_to_analysis(row, facts)
+    return found
+
+
+_INSERT_MATCH = """
+    INSERT INTO profile_match_history
+    (user_id, job_id, cv_hash, score, coverage, similarity, analysis_json, created_at, cv_source, cv_label, job_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, job_id, cv_hash) DO UPDATE SET
+        score=excluded.score,
+        coverage=excluded.coverage,
+        similarity=excluded.similarity,
+        analysis_json=excluded.analysis_json,
+        created_at=excluded.created_at,
+        cv_source=excluded.cv_source,
+        cv_label=excluded.cv_label,
+        job_hash=excluded.job_hash
+"""
+
+
+def _analysis_delta(analysis: Dict[str, Any], facts: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value
+        for key, value in analysis.items()
+        if key not in CV_FIELDS or key not in facts or facts[key] != value
+    }
+
+
+# What a malformed match (missing keys, values that do not convert or do not
+# serialise to JSON) raises while its parameters are prepared.
+_INVALID_ROW = (KeyError, TypeError, ValueError)
+
+
+def _match_params(
+    user_id: int, match: Dict[str, Any], now: int, facts: Dict[str, Dict[str, Any]]
+) -> Tuple[Any, ...]:
+    return (
+        user_id,
+        int(match["job_id"]),
+        match["cv_hash"],
+        float(match["score"]),
+        float(match["coverage"]),
+        float(match["similarity"]),
+        json.dumps(_analysis_delta(match["analysis"], facts.get(match["cv_hash"], {}))),
+        now,
+        match.get("cv_source") or "",
+        match.get("cv_label") or "",
+        match.get("job_hash") or "",
+    )
+
+
+def save_matches(user_id: int, matches: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+    """Persist many match rows with one commit.
+
+    Rows replace any earlier match for the same user, job and CV. Each entry
+    carries the keyword arguments of ``save_match``. Returns ``(index,
+    error)`` for every row that could not be stored; the others are still
+    written.
+    """
+    if not matches:
+        return []
+    now = _now()
+    conn = get_connection()
+    cur = conn.cursor()
+
+    try:
+        facts = _store_cv_facts(cur, matches, now)
+        failures: List[Tuple[int, str]] = []
+        params: List[Tuple[Any, ...]] = []
+        for index, match in enumerate(matches):
+            try:
+                params.append(_match_params(user_id, match, now, facts))
+            except _INVALID_ROW as exc:
+                failures.append((index, f"invalid row: {exc}"))
+        cur.executemany(_INSERT_MATCH, params)
+        conn.commit()
+        return failures
+    except (sqlite3.Error, *_INVALID_ROW):
+        conn.rollback()
+    # Retry row by row so one bad row does not drop the whole batch. The
+    # rollback also undid the facts insert, so each row stores its own.
+    failures = []
+    for index, match in enumerate(matches):
+        try:
+            facts = _store_cv_facts(cur, [match], now)
+            cur.execute(_INSERT_MATCH, _match_params(user_id, match, now, facts))
+        except sqlite3.Error as exc:
+            failures.append((index, str(exc)))
+        except _INVALID_ROW as exc:
+            failures.append((index, f"invalid row: {exc}"))
+    conn.commit()
+    return failures
 
 
 def save_match(
@@ -45,29 +224,24 @@ def save_match(
     analysis: Dict[str, Any],
     cv_source: str = "",
     cv_label: str = "",
+    job_hash: str = "",
 ) -> None:
+    match = {
+        "job_id": job_id,
+        "cv_hash": cv_hash,
+        "score": score,
+        "coverage": coverage,
+        "similarity": similarity,
+        "analysis": analysis,
+        "cv_source": cv_source,
+        "cv_label": cv_label,
+        "job_hash": job_hash,
+    }
+    now = _now()
     conn = get_connection()
     cur = conn.cursor()
-    payload = json.dumps(analysis)
-    cur.execute(
-        """
-        INSERT INTO profile_match_history
-        (user_id, job_id, cv_hash, score, coverage, similarity, analysis_json, created_at, cv_source, cv_label)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            user_id,
-            job_id,
-            cv_hash,
-            float(score),
-            float(coverage),
-            float(similarity),
-            payload,
-            _now(),
-            cv_source or "",
-            cv_label or "",
-        ),
-    )
+    facts = _store_cv_facts(cur, [match], now)
+    cur.execute(_INSERT_MATCH, _match_params(user_id, match, now, facts))
     conn.commit()
 
 
@@ -76,22 +250,26 @@ def list_history(user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
     cur = conn.cursor()
     cur.execute(
         """
-        SELECT h.job_id, h.score, h.coverage, h.similarity, h.analysis_json, h.created_at,
-               h.cv_source, h.cv_label,
+        SELECT h.job_id, h.cv_hash, h.score, h.coverage, h.similarity, h.analysis_json,
+               h.created_at, h.cv_source, h.cv_label,
                j.title, j.company_name, j.jd_text, j.status, j.published
         FROM profile_match_history h
         JOIN jobs j ON j.id = h.job_id
         WHERE h.user_id=?
-        ORDER BY datetime(h.created_at) DESC
+        ORDER BY h.created_at DESC, h.id DESC
         LIMIT ?
         """,
         (user_id, limit),
     )
     rows = cur.fetchall()
+    facts = _load_cv_facts(cur, [row["cv_hash"] for row in rows])
     history: List[Dict[str, Any]] = []
     for row in rows:
         row_dict = dict(row)
-        analysis = json.loads(row_dict.get("analysis_json") or "{}")
+        analysis = {
+            **facts.get(row_dict["cv_hash"], {}),
+            **json.loads(row_dict.get("analysis_json") or "{}"),
+        }
         analysis["score"] = row_dict["score"]
         analysis["coverage"] = row_dict["coverage"]
         analysis["similarity"] = row_dict["similarity"]
@@ -106,7 +284,7 @@ def list_history(user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
                     "published": row_dict["published"],
                 },
                 "match": analysis,
-                "matched_at": row_dict["created_at"],
+                "matched_at": _iso(row_dict["created_at"]),
                 "cv_source": row_dict.get("cv_source") or "",
                 "cv_label": row_dict.get("cv_label") or "",
             }
@@ -118,4 +296,11 @@ def clear_history(user_id: int) -> None:
     conn = get_connection()
     cur = conn.cursor()
     cur.execute("DELETE FROM profile_match_history WHERE user_id=?", (user_id,))
+    # CV facts are shared by cv_hash; drop the ones no history row uses.
+    cur.execute(
+        """
+        DELETE FROM profile_match_cv_facts
+        WHERE cv_hash NOT IN (SELECT cv_hash FROM profile_match_history)
+        """
+    )
     conn.commit()
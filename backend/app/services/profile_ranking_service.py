@@ -0,0 +1,238 @@
+"""Two-stage ranking of published jobs against a student's CV.
+
+Stage one scores every job deterministically (embedding similarity plus
+skill coverage), reusing persisted matches where the CV and job are
+unchanged. Stage two sends only the best ``limit * oversample`` fresh
+candidates through Gemini enrichment and re-ranks them. Each match carries a
+``stage`` saying where its score came from.
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import PROFILE_MATCH_OVERSAMPLE
+from app.dao.jobs_dao import get_job_set_version, get_jobs_by_ids, list_jobs
+from app.dao.processed_dao import list_job_ids_by_email
+from app.schemas.schemas import CVProcessResult
+from app.services import (
+    analysis_cache_service,
+    gemini_service,
+    profile_match_service,
+    ranking_snapshot_service,
+)
+from app.services.cv_matching_service import (
+    CVFeatures,
+    iter_analyse_cv_features,
+    score_cv_features_batch,
+)
+
+STAGE_CACHED = "cached"  # persisted before stages were recorded
+STAGE_DETERMINISTIC = "deterministic"
+STAGE_ENRICHED = "enriched"
+
+Job = Dict[str, Any]
+Match = Dict[str, Any]
+
+
+def candidate_jobs(user: Dict[str, Any]) -> List[Job]:
+    """Published jobs the user has not applied to yet."""
+    jobs = list_jobs(published_only=True)
+    email = (user.get("email") or "").strip()
+    if email:
+        applied_ids = set(list_job_ids_by_email(email))
+        if applied_ids:
+            jobs = [job for job in jobs if job.get("id") not in applied_ids]
+    return jobs
+
+
+def versioned_candidate_jobs(user: Dict[str, Any]) -> Tuple[int, List[Job]]:
+    """``(job_set_version, candidate_jobs(user))``, the version read first so a
+    job change made meanwhile makes the result look stale, not current."""
+    version = get_job_set_version()
+    return version, candidate_jobs(user)
+
+
+def match_score(analysis: Dict[str, Any]) -> float:
+    return round(
+        (float(analysis.get("coverage", 0.0)) + float(analysis.get("similarity", 0.0))) / 2.0,
+        4,
+    )
+
+
+def _fresh_match(result: CVProcessResult, stage: str) -> Match:
+    analysis = result.dict()
+    return {**analysis, "score": match_score(analysis), "stage": stage}
+
+
+def _persisted_matches(
+    user_id: int, cv_hash: str, job_hashes: Dict[int, str]
+) -> Dict[int, Match]:
+    return {
+        job_id: {
+            **analysis,
+            "score": float(analysis.get("score") or 0.0),
+            "stage": analysis.get("stage") or STAGE_CACHED,
+        }
+        for job_id, analysis in profile_match_service.get_cached_matches(
+            user_id, cv_hash, job_hashes
+        ).items()
+    }
+
+
+def iter_matches(
+    user_id: int,
+    features: CVFeatures,
+    jobs: List[Job],
+    limit: Optional[int] = None,
+    oversample: int = PROFILE_MATCH_OVERSAMPLE,
+    budget: Optional[float] = None,
+    cv_source: str = "",
+    cv_label: str = "",
+) -> Iterator[Tuple[Job, Match]]:
+    """Yield ``(job, match)`` every time a job gets a (better) score.
+
+    Order: persisted matches, then stage-one scores for the rest, then each
+    enriched shortlist entry as its Gemini call completes. A job may be
+    yielded twice (deterministic, then enriched); the later match wins.
+    Enriched (and, with Gemini disabled, deterministic) results are persisted
+    to the profile-match history when the iterator finishes or is closed;
+    stage-one-only scores are not.
+    """
+    limit = len(jobs) if limit is None else limit
+    enabled = gemini_service.gemini_available()
+    jobs_by_id = {job["id"]: job for job in jobs}
+    job_hashes = {job["id"]: analysis_cache_service.job_content_hash(job) for job in jobs}
+    matches: Dict[int, Match] = {}
+    for job_id, match in _persisted_matches(user_id, features.cv_hash, job_hashes).items():
+        if enabled and match["stage"] == STAGE_DETERMINISTIC:
+            continue  # stored while Gemini was off; worth enriching now
+        matches[job_id] = match
+        yield jobs_by_id[job_id], match
+
+    misses = [job for job in jobs if job["id"] not in matches]
+    shortlist = misses
+    if enabled and misses:
+        # Stage one: cheap scores for everything, then keep the fresh jobs
+        # that can still make the top limit * oversample.
+        for job, result in zip(misses, score_cv_features_batch(features, misses)):
+            matches[job["id"]] = _fresh_match(result, STAGE_DETERMINISTIC)
+            yield job, matches[job["id"]]
+        ranked = sorted(jobs, key=lambda job: matches[job["id"]]["score"], reverse=True)
+        top_ids = {job["id"] for job in ranked[: limit * max(1, oversample)]}
+        shortlist = [job for job in misses if job["id"] in top_ids]
+
+    new_rows: List[Dict[str, Any]] = []
+    try:
+        for pos, result in iter_analyse_cv_features(features, shortlist, budget=budget):
+            job = shortlist[pos]
+            status = result.enrichment_status
+            match = _fresh_match(
+                result, STAGE_ENRICHED if status == "completed" else STAGE_DETERMINISTIC
+            )
+            # Pending, deferred and failed enrichments are retried on the next
+            # request; "skipped" means Gemini is off, so that result is final.
+            if status in ("completed", "skipped"):
+                new_rows.append(
+                    {
+                        "job_id": job["id"],
+                        "cv_hash": features.cv_hash,
+                        "score": match["score"],
+                        "coverage": match["coverage"],
+                        "similarity": match["similarity"],
+                        "analysis": {k: v for k, v in match.items() if k != "score"},
+                        "cv_source": cv_source,
+                        "cv_label": cv_label,
+                        "job_hash": job_hashes[job["id"]],
+                    }
+                )
+            yield job, match
+    finally:
+        # Rows that fail to persist are simply recomputed on the next request.
+        profile_match_service.save_matches(user_id, new_rows)
+
+
+def top_matches(
+    latest: Dict[int, Tuple[Job, Match]], limit: int
+) -> List[Tuple[Job, Match]]:
+    return heapq.nlargest(limit, latest.values(), key=lambda pair: pair[1]["score"])
+
+
+def rank_all_jobs(
+    user_id: int,
+    features: CVFeatures,
+    jobs: List[Job],
+    limit: Optional[int] = None,
+    oversample: int = PROFILE_MATCH_OVERSAMPLE,
+    budget: Optional[float] = None,
+    cv_source: str = "",
+    cv_label: str = "",
+) -> List[Tuple[Job, Match]]:
+    """Every job ranked for one CV, best first; only the top ``limit *
+    oversample`` are enriched."""
+    latest: Dict[int, Tuple[Job, Match]] = {}
+    for job, match in iter_matches(
+        user_id, features, jobs, limit, oversample, budget, cv_source, cv_label
+    ):
+        latest[job["id"]] = (job, match)
+    return sorted(latest.values(), key=lambda pair: pair[1]["score"], reverse=True)
+
+
+def rank_and_snapshot(
+    user: Dict[str, Any],
+    features: CVFeatures,
+    jobs: List[Job],
+    version: int,
+    limit: int,
+    oversample: int = PROFILE_MATCH_OVERSAMPLE,
+    budget: Optional[float] = None,
+    cv_source: str = "",
+    cv_label: str = "",
+) -> Tuple[int, List[List[Any]], List[Tuple[Job, Match]]]:
+    """Rank the user's candidate ``jobs`` and store the result as their
+    snapshot of job set ``version`` (see ``versioned_candidate_jobs``).
+
+    Returns ``(snapshot_id, entries, ranked)``. The snapshot is marked
+    incomplete when any match is degraded (enrichment pending or deferred
+    by the budget) or failed, so the next request re-ranks it.
+    """
+    ranked = rank_all_jobs(
+        user["id"],
+        features,
+        jobs,
+        limit=limit,
+        oversample=oversample,
+        budget=budget,
+        cv_source=cv_source,
+        cv_label=cv_label,
+    )
+    entries = [[job["id"], match["score"], match["stage"]] for job, match in ranked]
+    complete = not any(
+        match.get("degraded")
+        or match.get("enrichment_status") in ("pending", "deferred", "failed")
+        for _, match in ranked
+    )
+    snapshot_id = ranking_snapshot_service.save_snapshot(
+        user["id"], features.cv_hash, version, entries, complete=complete
+    )
+    return snapshot_id, entries, ranked
+
+
+def matches_for_job_ids(
+    user_id: int, features: CVFeatures, job_ids: List[int]
+) -> List[Tuple[Job, Match]]:
+    """Re-hydrate one page of a stored ranking, in ``job_ids`` order.
+
+    Persisted matches are reused; anything else (stage-one scores, cleared
+    history) is rescored deterministically. Jobs that no longer exist are
+    skipped.
+    """
+    jobs_by_id = get_jobs_by_ids(job_ids)
+    jobs = [jobs_by_id[job_id] for job_id in job_ids if job_id in jobs_by_id]
+    job_hashes = {job["id"]: analysis_cache_service.job_content_hash(job) for job in jobs}
+    matches = _persisted_matches(user_id, features.cv_hash, job_hashes)
+    rest = [job for job in jobs if job["id"] not in matches]
+    for job, result in zip(rest, score_cv_features_batch(features, rest)):
+        matches[job["id"]] = _fresh_match(result, STAGE_DETERMINISTIC)
+    return [(job, matches[job["id"]]) for job in jobs]
@@ -3,7 +3,7 @@ from __future__ import annotations
 import base64
 import json
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.core.db import get_connection
 from app.services import gemini_service, profile_templates
@@ -333,7 +333,77 @@ def uploaded_cv_plaintext(entry: Dict[str, Any]) -> str:
     return (data.get("text") or "").strip()
 
 
+def get_active_cv(user_id: int) -> Optional[Dict[str, str]]:
+    """Text, source tag and display label of the user's active CV, if any.
+
+    An active profile draft takes precedence over an active uploaded CV.
+    """
+    draft = get_active_draft(user_id)
+    return _active_cv(draft, None if draft else get_active_uploaded_cv(user_id))
+
+
+def list_open_student_cvs() -> List[Tuple[int, Dict[str, str]]]:
+    """``(user_id, get_active_cv(user_id))`` for every opted-in, non-banned
+    student with a non-empty active CV, read in one query."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT u.id AS user_id,
+               d.id AS draft_id, d.draft_title, d.data_json AS draft_data,
+               c.id AS uploaded_id, c.name AS uploaded_name, c.data_json AS uploaded_data
+        FROM users u
+        LEFT JOIN profile_drafts d ON d.id = u.active_profile_draft_id AND d.user_id = u.id
+        LEFT JOIN uploaded_cvs c ON c.id = u.active_uploaded_cv_id AND c.user_id = u.id
+        WHERE u.role = 'student' AND u.open_to_matching = 1 AND COALESCE(u.is_banned, 0) = 0
+          AND (u.active_profile_draft_id IS NOT NULL OR u.active_uploaded_cv_id IS NOT NULL)
+        ORDER BY u.id
+        """
+    )
+    out: List[Tuple[int, Dict[str, str]]] = []
+    for row in cur.fetchall():
+        draft = (
+            {"id": row["draft_id"], "draft_title": row["draft_title"], "data_json": row["draft_data"]}
+            if row["draft_id"] is not None
+            else None
+        )
+        uploaded = (
+            {"id": row["uploaded_id"], "name": row["uploaded_name"], "data_json": row["uploaded_data"]}
+            if draft is None and row["uploaded_id"] is not None
+            else None
+        )
+        active_cv = _active_cv(draft, uploaded)
+        if active_cv:
+            out.append((int(row["user_id"]), active_cv))
+    return out
+
+
+def _active_cv(
+    draft: Optional[Dict[str, Any]], uploaded: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, str]]:
+    if draft:
+        text = draft_to_plaintext(draft).strip()
+        try:
+            data = json.loads(draft.get("data_json") or "{}")
+        except Exception:
+            data = {}
+        label = (
+            (draft.get("draft_title") or "").strip()
+            or (data.get("name") or "").strip()
+            or f"Draft #{draft['id']}"
+        )
+        return {"text": text, "source": f"draft:{draft['id']}", "label": label} if text else None
+    if uploaded:
+        text = uploaded_cv_plaintext(uploaded)
+        label = (uploaded.get("name") or "Uploaded CV").strip()
+        return {"text": text, "source": f"uploaded:{uploaded['id']}", "label": label} if text else None
+    return None
+
+
 def draft_to_plaintext(draft: Dict[str, Any]) -> str:
+    # Deliberately left as is by the single-pass analyser: CV hashes, and so
+    # every cached analysis and stored match, are keyed on this exact text.
+    # Contacts are stripped later, by cv_document_service.analyse_document.
     data = json.loads(draft.get("data_json") or "{}")
     parts: List[str] = []
     for key in ("name", "headline", "contact_block", "summary"):
@@ -0,0 +1,132 @@
+"""Persisted profile-match rankings and the opaque cursors that page them.
+
+A snapshot is the full ordered list of ``[job_id, score, stage]`` for one
+user and CV hash, tagged with the job-set version (bumped by every job
+write) and a hash of the candidate job IDs (which changes when the user
+applies somewhere). Only the latest snapshot per user is kept.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.db import get_connection
+from app.dao.jobs_dao import get_job_set_version
+
+Entry = List[Any]  # [job_id, score, stage]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def candidates_hash(job_ids: Iterable[int]) -> str:
+    joined = ",".join(str(job_id) for job_id in sorted(job_ids))
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def _row_to_snapshot(row) -> Dict[str, Any]:
+    snapshot = dict(row)
+    snapshot["entries"] = json.loads(snapshot.pop("ranking_json") or "[]")
+    return snapshot
+
+
+def find_current(
+    user_id: int, cv_hash: str, job_ids: Iterable[int]
+) -> Optional[Dict[str, Any]]:
+    """The user's complete snapshot for this CV and candidate set, if still valid."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT * FROM profile_match_snapshots
+        WHERE user_id=? AND cv_hash=? AND job_set_version=? AND candidates_hash=? AND complete=1
+        ORDER BY id DESC
+        LIMIT 1
+        """,
+        (user_id, cv_hash, get_job_set_version(), candidates_hash(job_ids)),
+    )
+    row = cur.fetchone()
+    return _row_to_snapshot(row) if row else None
+
+
+def get_snapshot(snapshot_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT * FROM profile_match_snapshots WHERE id=? AND user_id=?",
+        (snapshot_id, user_id),
+    )
+    row = cur.fetchone()
+    return _row_to_snapshot(row) if row else None
+
+
+def is_current(snapshot: Dict[str, Any], cv_hash: str) -> bool:
+    return (
+        snapshot.get("cv_hash") == cv_hash
+        and int(snapshot.get("job_set_version") or 0) == get_job_set_version()
+    )
+
+
+def save_snapshot(
+    user_id: int,
+    cv_hash: str,
+    job_set_version: int,
+    entries: List[Entry],
+    complete: bool = True,
+) -> int:
+    """Store a ranking and drop the user's older snapshots.
+
+    Incomplete snapshots (some enrichment still pending) are only reachable
+    through their cursors; the next first-page request re-ranks.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM profile_match_snapshots WHERE user_id=?", (user_id,))
+    cur.execute(
+        """
+        INSERT INTO profile_match_snapshots
+        (user_id, cv_hash, job_set_version, candidates_hash, complete, ranking_json, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            user_id,
+            cv_hash,
+            int(job_set_version),
+            candidates_hash(entry[0] for entry in entries),
+            1 if complete else 0,
+            json.dumps(entries, separators=(",", ":")),
+            _now(),
+        ),
+    )
+    conn.commit()
+    return cur.lastrowid
+
+
+def clear_snapshots(user_id: int) -> None:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM profile_match_snapshots WHERE user_id=?", (user_id,))
+    conn.commit()
+
+
+def encode_cursor(snapshot_id: int, offset: int) -> str:
+    raw = json.dumps({"s": int(snapshot_id), "o": int(offset)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Return (snapshot_id, offset); raises ValueError for a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        snapshot_id, offset = int(data["s"]), int(data["o"])
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return snapshot_id, offset
@@ -0,0 +1,404 @@
+"""Sparse skill x skill co-occurrence index built from the skills of every job.
+
+The mutable state is a per-job skill list plus pair counts, only touched under
+``_LOCK``; queries run against an immutable snapshot (vocabulary, labels,
+document frequencies and a CSR matrix with rows sorted by weight) that writers
+swap in as one tuple. A job write re-sorts only the rows of the skills it
+touched and splices them into the CSR matrix; the file at
+``SKILL_GRAPH_PATH`` is rewritten at most once per ``SKILL_GRAPH_SAVE_DELAY``
+seconds and on shutdown (``flush``).
+
+Every change bumps the ``skill_graph`` counter in ``app_counters`` and the
+saved file records the value it reflects. A file or in-memory index that is
+behind the counter (another worker changed a job) is rebuilt from the jobs
+table; readers check at most every ``_VERSION_CHECK_INTERVAL`` seconds.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import SKILL_GRAPH_PATH, SKILL_GRAPH_SAVE_DELAY
+from app.core.db import get_connection
+from app.services.skills_service import extract_skills
+
+SKILL_GRAPH_VERSION = "skill_graph"
+_VERSION_CHECK_INTERVAL = 5.0
+
+_LOCK = threading.RLock()
+_LOADED = False
+_VERSION = 0  # skill_graph counter value the in-memory index reflects
+_CHECKED_AT = 0.0
+_DIRTY = False
+_SAVE_TIMER: Optional[threading.Timer] = None
+
+_VOCAB: Dict[str, int] = {}  # canonical skill -> id
+_LABELS: List[str] = []  # id -> display label
+_DF: List[int] = []  # id -> number of jobs mentioning the skill
+_JOB_SKILLS: Dict[int, Tuple[int, ...]] = {}
+_PAIRS: Dict[int, Dict[int, int]] = {}
+
+# CSR matrix (indptr, indices, data) of the working state
+_CSR: Tuple[np.ndarray, np.ndarray, np.ndarray] = (
+    np.zeros(1, dtype=np.int64),
+    np.zeros(0, dtype=np.int32),
+    np.zeros(0, dtype=np.int32),
+)
+
+# What readers see: (vocab, labels, df, csr), replaced as a whole by _publish
+_Snapshot = Tuple[
+    Dict[str, int], Tuple[str, ...], np.ndarray, Tuple[np.ndarray, np.ndarray, np.ndarray]
+]
+_SNAPSHOT: _Snapshot = ({}, (), np.zeros(0, dtype=np.int64), _CSR)
+
+
+def _canonical(skill: str) -> str:
+    return " ".join((skill or "").lower().split())
+
+
+def _skill_id(label: str) -> int:
+    key = _canonical(label)
+    idx = _VOCAB.get(key)
+    if idx is None:
+        idx = len(_LABELS)
+        _VOCAB[key] = idx
+        _LABELS.append(label.strip())
+        _DF.append(0)
+    return idx
+
+
+def _skills_for_text(jd_text: str) -> Tuple[int, ...]:
+    ids = {_skill_id(s) for s in extract_skills(jd_text or "") if _canonical(s)}
+    return tuple(sorted(ids))
+
+
+def _apply(skill_ids: Iterable[int], delta: int) -> None:
+    ids = list(skill_ids)
+    for a in ids:
+        _DF[a] += delta
+        row = _PAIRS.setdefault(a, {})
+        for b in ids:
+            if a == b:
+                continue
+            count = row.get(b, 0) + delta
+            if count > 0:
+                row[b] = count
+            else:
+                row.pop(b, None)
+
+
+def _read_version() -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT value FROM app_counters WHERE name = ?", (SKILL_GRAPH_VERSION,))
+    row = cur.fetchone()
+    return int(row["value"]) if row else 0
+
+
+def _bump_version() -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO app_counters (name, value) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1
+        """,
+        (SKILL_GRAPH_VERSION,),
+    )
+    cur.execute("SELECT value FROM app_counters WHERE name = ?", (SKILL_GRAPH_VERSION,))
+    version = int(cur.fetchone()["value"])
+    conn.commit()
+    return version
+
+
+def _sorted_row(a: int) -> Tuple[List[int], List[int]]:
+    row = sorted(_PAIRS.get(a, {}).items(), key=lambda kv: -kv[1])
+    return [b for b, _ in row], [c for _, c in row]
+
+
+def _publish() -> None:
+    global _SNAPSHOT
+    _SNAPSHOT = (dict(_VOCAB), tuple(_LABELS), np.asarray(_DF, dtype=np.int64), _CSR)
+
+
+def _build_csr() -> None:
+    global _CSR
+    size = len(_LABELS)
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    indices: List[int] = []
+    data: List[int] = []
+    for a in range(size):
+        row_indices, row_data = _sorted_row(a)
+        indices.extend(row_indices)
+        data.extend(row_data)
+        indptr[a + 1] = len(indices)
+    _CSR = (indptr, np.asarray(indices, dtype=np.int32), np.asarray(data, dtype=np.int32))
+    _publish()
+
+
+def _patch_csr(rows: Iterable[int]) -> None:
+    """Re-sort only ``rows`` (plus skills new since the last snapshot) and
+    splice them into the CSR snapshot; every other row is copied as is."""
+    global _CSR
+    indptr, indices, data = _CSR
+    old_size, size = len(indptr) - 1, len(_LABELS)
+    lengths = np.zeros(size, dtype=np.int64)
+    lengths[:old_size] = np.diff(indptr)
+    index_parts: List[np.ndarray] = []
+    data_parts: List[np.ndarray] = []
+    done = 0  # rows before this are already in the parts
+    for a in sorted(set(rows) | set(range(old_size, size))):
+        if a > done and done < old_size:
+            start, end = int(indptr[done]), int(indptr[min(a, old_size)])
+            index_parts.append(indices[start:end])
+            data_parts.append(data[start:end])
+        row_indices, row_data = _sorted_row(a)
+        index_parts.append(np.asarray(row_indices, dtype=np.int32))
+        data_parts.append(np.asarray(row_data, dtype=np.int32))
+        lengths[a] = len(row_indices)
+        done = a + 1
+    if done < old_size:
+        index_parts.append(indices[int(indptr[done]) :])
+        data_parts.append(data[int(indptr[done]) :])
+    new_indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_indptr[1:])
+    _CSR = (
+        new_indptr,
+        np.concatenate(index_parts) if index_parts else indices[:0],
+        np.concatenate(data_parts) if data_parts else data[:0],
+    )
+    _publish()
+
+
+def _save() -> None:
+    job_ids = sorted(_JOB_SKILLS)
+    job_indptr = np.zeros(len(job_ids) + 1, dtype=np.int64)
+    job_indices: List[int] = []
+    for i, job_id in enumerate(job_ids):
+        job_indices.extend(_JOB_SKILLS[job_id])
+        job_indptr[i + 1] = len(job_indices)
+    indptr, indices, data = _CSR
+    tmp_path = f"{SKILL_GRAPH_PATH}.tmp"
+    try:
+        with open(tmp_path, "wb") as fh:
+            np.savez_compressed(
+                fh,
+                labels=np.asarray(_LABELS, dtype=str),
+                df=np.asarray(_DF, dtype=np.int32),
+                job_ids=np.asarray(job_ids, dtype=np.int64),
+                job_indptr=job_indptr,
+                job_indices=np.asarray(job_indices, dtype=np.int32),
+                indptr=indptr,
+                indices=indices,
+                data=data,
+                version=np.asarray(_VERSION, dtype=np.int64),
+            )
+        os.replace(tmp_path, SKILL_GRAPH_PATH)
+    except OSError:
+        pass
+
+
+def _load(version: int) -> bool:
+    """Load the saved index if it reflects ``version`` of the skill graph."""
+    global _CSR, _VERSION
+    if not os.path.exists(SKILL_GRAPH_PATH):
+        return False
+    try:
+        with np.load(SKILL_GRAPH_PATH) as payload:
+            if "version" not in payload.files or int(payload["version"]) != version:
+                return False
+            labels = [str(x) for x in payload["labels"]]
+            df = [int(x) for x in payload["df"]]
+            job_ids = payload["job_ids"]
+            job_indptr = payload["job_indptr"]
+            job_indices = payload["job_indices"]
+            indptr = payload["indptr"]
+            indices = payload["indices"]
+            data = payload["data"]
+    except Exception:
+        return False
+    _reset()
+    for label in labels:
+        _skill_id(label)
+    _DF[:] = df
+    for i, job_id in enumerate(job_ids):
+        start, end = int(job_indptr[i]), int(job_indptr[i + 1])
+        _JOB_SKILLS[int(job_id)] = tuple(int(x) for x in job_indices[start:end])
+    for a in range(len(labels)):
+        start, end = int(indptr[a]), int(indptr[a + 1])
+        if end > start:
+            _PAIRS[a] = {int(b): int(c) for b, c in zip(indices[start:end], data[start:end])}
+    _CSR = (indptr, indices, data)
+    _publish()
+    _VERSION = version
+    return True
+
+
+def _reset() -> None:
+    _VOCAB.clear()
+    _LABELS.clear()
+    _DF.clear()
+    _JOB_SKILLS.clear()
+    _PAIRS.clear()
+
+
+def _ensure_loaded() -> None:
+    """Load or rebuild the index, and rebuild it when another worker has
+    changed the skill graph since (checked at most every few seconds)."""
+    global _LOADED, _CHECKED_AT
+    now = time.monotonic()
+    if _LOADED and now - _CHECKED_AT < _VERSION_CHECK_INTERVAL:
+        return
+    with _LOCK:
+        version = _read_version()
+        _CHECKED_AT = now
+        if _LOADED and version == _VERSION:
+            return
+        if _LOADED or not _load(version):
+            _rebuild_locked(version)
+        _LOADED = True
+
+
+def _rebuild_locked(version: int) -> None:
+    from app.dao.jobs_dao import list_jobs
+
+    global _VERSION
+    _reset()
+    # ``version`` is read before the jobs, so a change made meanwhile
+    # triggers another rebuild instead of being lost.
+    for job in list_jobs():
+        skill_ids = _skills_for_text(job.get("jd_text") or "")
+        _JOB_SKILLS[int(job["id"])] = skill_ids
+        _apply(skill_ids, 1)
+    _build_csr()
+    _VERSION = version
+    _save()
+
+
+def _changed_locked(rows: Iterable[int]) -> None:
+    """Publish a local change: patch the snapshot, bump the counter and
+    schedule a save. A counter that moved by more than our own bump means
+    another worker changed jobs too, so rebuild instead."""
+    global _VERSION, _DIRTY
+    previous = _VERSION
+    version = _bump_version()
+    if version != previous + 1:
+        _rebuild_locked(version)
+        return
+    _patch_csr(rows)
+    _VERSION = version
+    _DIRTY = True
+    _schedule_save()
+
+
+def _schedule_save() -> None:
+    global _SAVE_TIMER
+    if _SAVE_TIMER is not None and _SAVE_TIMER.is_alive():
+        return  # the pending save picks up this change too
+    _SAVE_TIMER = threading.Timer(SKILL_GRAPH_SAVE_DELAY, flush)
+    _SAVE_TIMER.daemon = True
+    _SAVE_TIMER.start()
+
+
+def flush() -> None:
+    """Write pending changes to ``SKILL_GRAPH_PATH`` now."""
+    global _DIRTY
+    with _LOCK:
+        if _DIRTY:
+            _save()
+            _DIRTY = False
+
+
+def index_job(job_id: int, jd_text: str) -> None:
+    """Add or replace the skills contributed by one job."""
+    _ensure_loaded()
+    with _LOCK:
+        previous = _JOB_SKILLS.pop(int(job_id), ())
+        current = _skills_for_text(jd_text)
+        if previous == current:
+            _JOB_SKILLS[int(job_id)] = current
+            return
+        _apply(previous, -1)
+        _apply(current, 1)
+        _JOB_SKILLS[int(job_id)] = current
+        _changed_locked(set(previous) | set(current))
+
+
+def remove_job(job_id: int) -> None:
+    _ensure_loaded()
+    with _LOCK:
+        previous = _JOB_SKILLS.pop(int(job_id), None)
+        if previous is None:
+            return
+        _apply(previous, -1)
+        _changed_locked(previous)
+
+
+def _ranked_neighbors(snapshot: _Snapshot, skill_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Neighbours of ``skill_id`` and their Jaccard scores, best score first."""
+    _, _, df, (indptr, indices, data) = snapshot
+    if skill_id + 1 >= len(indptr):
+        return indices[:0], np.zeros(0)
+    start, end = int(indptr[skill_id]), int(indptr[skill_id + 1])
+    neighbors, counts = indices[start:end], data[start:end]
+    union = df[skill_id] + df[neighbors] - counts
+    scores = np.divide(counts, union, out=np.zeros(len(counts)), where=union > 0)
+    order = np.argsort(-scores, kind="stable")
+    return neighbors[order], scores[order]
+
+
+def related_skills(skill: str, top_n: int = 5, min_score: float = 0.0) -> List[Tuple[str, float]]:
+    """Skills that most often appear in the same job postings as ``skill``."""
+    _ensure_loaded()
+    snapshot = _SNAPSHOT
+    vocab, labels = snapshot[0], snapshot[1]
+    skill_id = vocab.get(_canonical(skill))
+    if skill_id is None:
+        return []
+    neighbors, scores = _ranked_neighbors(snapshot, skill_id)
+    keep = scores >= min_score
+    return [
+        (labels[b], round(float(score), 4))
+        for b, score in zip(neighbors[keep][:top_n].tolist(), scores[keep][:top_n].tolist())
+    ]
+
+
+def partial_credit_neighbors(
+    missing: Iterable[str],
+    available: Iterable[str],
+    min_score: float = 0.2,
+    top_n: int = 3,
+) -> Dict[str, List[str]]:
+    """For each missing skill, the available skills that co-occur with it."""
+    _ensure_loaded()
+    snapshot = _SNAPSHOT
+    vocab = snapshot[0]
+    have: Dict[int, str] = {}
+    for label in available or []:
+        idx = vocab.get(_canonical(label))
+        if idx is not None:
+            have[idx] = label
+    if not have:
+        return {}
+    out: Dict[str, List[str]] = {}
+    for label in missing or []:
+        skill_id: Optional[int] = vocab.get(_canonical(label))
+        if skill_id is None:
+            continue
+        neighbors, scores = _ranked_neighbors(snapshot, skill_id)
+        hits: List[str] = []
+        for b, score in zip(neighbors.tolist(), scores.tolist()):
+            if score < min_score:
+                break
+            if b in have:
+                hits.append(have[b])
+                if len(hits) >= top_n:
+                    break
+        if hits:
+            out[label] = hits
+    return out
@@ -1,6 +1,8 @@
 import re
 from pathlib import Path
-from typing import List
+from typing import List, Optional
+
+from app.services.cv_document_service import CVDocument, analyse_document
 
 _SKILLS_LIST: List[str] = []
 ASSETS_DIR = Path(__file__).resolve().parent.parent / "assets"
@@ -47,16 +49,15 @@ _NOISE = {
     "hanoi", "vietnam"
 }
 
-def extract_skills(text: str, top_n: int = 20) -> List[str]:
+def extract_skills(text: str, top_n: int = 20, doc: Optional[CVDocument] = None) -> List[str]:
     """Rút gọn: trích 'kỹ năng' bằng regex đơn giản và lọc nhiễu.
     Backend skeleton dùng stub này để server khởi động được.
+    ``doc`` lets callers reuse an already analysed document.
     """
     if not text:
         return []
-    txt = re.sub(r"\s+", " ", text.replace("\n", " ").replace("\r", " ")).strip()
-    # Loại email/sđt/ngày tháng cơ bản
-    txt = re.sub(r"[\w\.-]+@[\w\.-]+\.[a-zA-Z]{2,}", " ", txt)
-    txt = re.sub(r"\+?\d[\d\s\-]{8,}", " ", txt)
+    # email/sđt đã được loại trong analyse_document
+    txt = (doc or analyse_document(text)).skill_text
     tokens = re.findall(r"[A-Za-z+#]+(?:\s+[A-Za-z+#]+){0,2}", txt)
     out: List[str] = []
     seen = set()
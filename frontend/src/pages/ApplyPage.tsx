@@ -1,14 +1,12 @@
 import React, { useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import {
+  applyToJob,
   downloadJobAttachment,
   getJob,
-  logApplicant,
   processCV,
   processCVFile,
-  uploadCvFile,
 } from "../services/backend";
-import { useAuth } from "../context/AuthContext";
 import { formatTime } from "../lib/time";
 import { sanitizeHtml, htmlToPlainText } from "../lib/sanitize";
 import RichTextEditor from "../components/text-editor";
@@ -17,7 +15,6 @@ export default function ApplyPage() {
   const { id } = useParams();
   const jobId = Number(id);
   const navigate = useNavigate();
-  const { user } = useAuth();
 
   const [job, setJob] = useState<any>(null);
   const [loadingJob, setLoadingJob] = useState(true);
@@ -105,47 +102,13 @@ export default function ApplyPage() {
     setNotice(null);
     setApplying(true);
 
-    let uploadedFileInfo: { path?: string; filename?: string } | null = null;
-    if (cvFile) {
-      try {
-        const uploadResponse = await uploadCvFile(cvFile);
-        uploadedFileInfo = uploadResponse.data;
-      } catch (uploadError: any) {
-        setErr(
-          uploadError?.response?.data?.detail ||
-            "Failed to upload CV file. Please try again."
-        );
-        setApplying(false);
-        return;
-      }
-    }
-
-    const payload = {
-      name: user?.name || "Candidate",
-      email: user?.email || "candidate@example.com",
-      uploaded_filename:
-        uploadedFileInfo?.filename || cvFile?.name || "(pasted text)",
-      uploaded_file_path: uploadedFileInfo?.path || "",
-      job_id: jobId,
-      jd_summary: (job.jd_text || "").slice(0, 1000),
-      coverage: result.coverage,
-      similarity: result.similarity,
-      missing: (result.missing || []).join(", "),
-      passed: result.passed ? 1 : 0,
-      hr_email: job.hr_email || "",
-      sent_email: 0,
-      predicted_role: result.predicted_role || "",
-      company_name: job.company_name || "",
-      job_title: job.title || "",
-      hr_name: "",
-      interview_mode: "",
-      schedule_link: "",
-      cv_text: cvText,
-    };
     try {
-      await logApplicant(payload);
+      // The server uploads, extracts, scores and logs in one request.
+      const res = await applyToJob(jobId, { file: cvFile, cv_text: cvText });
+      const applied = res.data?.result || result;
+      setResult(applied);
       setNotice(
-        result.passed
+        applied.passed
           ? "Your application has been submitted successfully. The employer will review it shortly."
           : "Application submitted. Consider improving your CV based on the AI feedback before reapplying."
       );
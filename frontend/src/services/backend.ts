@@ -86,6 +86,18 @@ export const listApplicants = (job_id: number) =>
 
 export const logApplicant = (payload: any) =>
   api.post("/applicants/log", payload);
+export const applyToJob = (
+  job_id: number,
+  payload: { file?: File | null; cv_text?: string }
+) => {
+  const form = new FormData();
+  form.append("job_id", String(job_id));
+  if (payload.file) form.append("file", payload.file);
+  if (payload.cv_text) form.append("cv_text", payload.cv_text);
+  return api.post("/applicants/apply", form, {
+    headers: { "Content-Type": "multipart/form-data" },
+  });
+};
 export const listMyApplications = () => api.get("/applicants/my");
 export const deleteMyApplication = (applicationId: number) =>
   api.delete(`/applicants/my/${applicationId}`);
@@ -0,0 +1,182 @@
+"""
+Check that the hot read queries are served by an index.
+
+Usage:
+    python scripts/check_query_plans.py              # fresh, migrated temp database
+    python scripts/check_query_plans.py --db PATH    # an existing, migrated database
+
+By default the checks run against a new temporary database brought up to the
+current schema by the migrations, so the developer's backend/jobs.db is never
+touched. With --db the plans reflect that database's schema and any
+ANALYZE statistics it has.
+
+Each read below is called once with the connection's trace callback on, and
+every SELECT it ran is passed through EXPLAIN QUERY PLAN. A full table scan or a
+temp B-tree for ORDER BY is reported, and the script exits 1. Queries that read
+a whole table on purpose are listed in FULL_SCANS. Only reads are executed.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+EMAIL = "student@example.com"
+CV_HASH = "0" * 64
+
+# Whole-table reads by design: the matching fan-out and the lexical candidate
+# ranking walk every student, and the candidate index rebuild loads every
+# embedding in user_id (rowid) order.
+FULL_SCANS = {
+    "users_dao.list_student_ids_with_active_cv",
+    "users_dao.list_open_student_ids",
+    "candidate_search_service._load_index",
+    "profile_service.list_open_student_cvs",
+}
+
+
+def build_checks() -> List[Tuple[str, Callable[[], object]]]:
+    from app.dao import jobs_dao, processed_dao, users_dao
+    from app.services import (
+        candidate_search_service,
+        profile_match_service,
+        profile_service,
+        ranking_snapshot_service,
+    )
+
+    return [
+        ("jobs_dao.get_job_by_id", lambda: jobs_dao.get_job_by_id(1)),
+        ("jobs_dao.get_jobs_by_ids", lambda: jobs_dao.get_jobs_by_ids([1, 2])),
+        ("jobs_dao.get_pending_jobs", jobs_dao.get_pending_jobs),
+        ("jobs_dao.list_jobs(published)", lambda: jobs_dao.list_jobs(published_only=True)),
+        ("jobs_dao.list_jobs(employer)", lambda: jobs_dao.list_jobs(employer_id=1)),
+        (
+            "jobs_dao.list_jobs(published, employer)",
+            lambda: jobs_dao.list_jobs(published_only=True, employer_id=1),
+        ),
+        ("jobs_dao.list_review_history", jobs_dao.list_review_history),
+        ("jobs_dao.get_job_set_version", jobs_dao.get_job_set_version),
+        ("processed_dao.list_by_job", lambda: processed_dao.list_by_job(1)),
+        ("processed_dao.get_by_id", lambda: processed_dao.get_by_id(1)),
+        ("processed_dao.list_by_email", lambda: processed_dao.list_by_email(EMAIL)),
+        (
+            "processed_dao.list_job_ids_by_email",
+            lambda: processed_dao.list_job_ids_by_email(EMAIL),
+        ),
+        (
+            "processed_dao.list_applicant_user_ids",
+            lambda: processed_dao.list_applicant_user_ids(1),
+        ),
+        (
+            "processed_dao.get_application_for_user",
+            lambda: processed_dao.get_application_for_user(1, EMAIL),
+        ),
+        ("users_dao.get_user_by_email", lambda: users_dao.get_user_by_email(EMAIL)),
+        ("users_dao.get_user_by_id", lambda: users_dao.get_user_by_id(1)),
+        ("users_dao.list_student_ids_with_active_cv", users_dao.list_student_ids_with_active_cv),
+        ("users_dao.list_open_student_ids", users_dao.list_open_student_ids),
+        ("profile_service.list_drafts", lambda: profile_service.list_drafts(1)),
+        ("profile_service.get_draft", lambda: profile_service.get_draft(1, 1)),
+        ("profile_service.list_open_student_cvs", profile_service.list_open_student_cvs),
+        (
+            "profile_match_service.get_cached_match",
+            lambda: profile_match_service.get_cached_match(1, 1, CV_HASH, ""),
+        ),
+        (
+            "profile_match_service.get_cached_matches",
+            lambda: profile_match_service.get_cached_matches(1, CV_HASH, {1: "", 2: ""}),
+        ),
+        ("profile_match_service.list_history", lambda: profile_match_service.list_history(1)),
+        (
+            "ranking_snapshot_service.find_current",
+            lambda: ranking_snapshot_service.find_current(1, CV_HASH, [1, 2]),
+        ),
+        (
+            "ranking_snapshot_service.get_snapshot",
+            lambda: ranking_snapshot_service.get_snapshot(1, 1),
+        ),
+        (
+            "candidate_search_service._load_index",
+            lambda: candidate_search_service._load_index("lexical"),
+        ),
+        (
+            "candidate_search_service._load_index(user_ids)",
+            lambda: candidate_search_service._load_index("lexical", [1, 2]),
+        ),
+        (
+            "candidate_search_service._changed_user_ids",
+            lambda: candidate_search_service._changed_user_ids(0, 2),
+        ),
+    ]
+
+
+def capture(conn: sqlite3.Connection, call: Callable[[], object]) -> List[str]:
+    statements: List[str] = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+
+def problems(conn: sqlite3.Connection, sql: str) -> List[str]:
+    found = []
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        detail = row[3]
+        if (detail.startswith("SCAN ") and " USING " not in detail) or detail == (
+            "USE TEMP B-TREE FOR ORDER BY"
+        ):
+            found.append(detail)
+    return found
+
+
+def run_checks(fresh: bool) -> int:
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.core.db import close_connections, get_connection
+    from app.core.migrations import ensure_current, migrate
+
+    conn = get_connection()
+    try:
+        if fresh:
+            migrate(conn)
+        else:
+            ensure_current(conn)
+        failures = 0
+        for name, call in build_checks():
+            issues = []
+            for sql in capture(conn, call):
+                issues.extend(problems(conn, sql))
+            if issues and name not in FULL_SCANS:
+                failures += 1
+                print(f"FAIL {name}: {'; '.join(issues)}")
+            else:
+                print(f"ok   {name}")
+        return failures
+    finally:
+        close_connections()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="check this migrated database instead of a fresh one")
+    args = parser.parse_args(argv)
+    # The backend reads DB_PATH at import time, so set it before importing app.
+    if args.db:
+        os.environ["DB_PATH"] = str(Path(args.db).resolve())
+        failures = run_checks(fresh=False)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["DB_PATH"] = os.path.join(tmp, "jobs.db")
+            failures = run_checks(fresh=True)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()